@@ -3,20 +3,261 @@
 
 Usage:
     uv run --with weasyprint python generate_estimate_pdf.py input.json [output.pdf]
+
+    # まとめて生成（ディレクトリの *.json、または1行1件のJSONL。"-" で標準入力）
+    uv run --with weasyprint python generate_estimate_pdf.py --batch inputs/ [--jobs 4] [--report report.jsonl]
+    uv run --with weasyprint python generate_estimate_pdf.py --batch estimates.jsonl --out-dir pdf/
 """
 
+import argparse
 import json
+import re
+import statistics
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
 from pathlib import Path
 
+# 見積書のスタイルシート。PDF生成時は1プロセスにつき1回だけ解析して使い回す
+STYLESHEET = """\
+@page {
+    size: A4;
+    margin: 18mm 15mm 15mm 15mm;
+}
+* {
+    margin: 0;
+    padding: 0;
+    box-sizing: border-box;
+}
+body {
+    font-family: "Hiragino Kaku Gothic ProN", "Hiragino Sans", "Yu Gothic", "Meiryo", sans-serif;
+    font-size: 9.5pt;
+    color: #222;
+    line-height: 1.5;
+}
+
+/* ヘッダー */
+.header {
+    text-align: center;
+    margin-bottom: 24px;
+}
+.header h1 {
+    font-size: 22pt;
+    font-weight: 700;
+    letter-spacing: 0.6em;
+    padding-bottom: 6px;
+    border-bottom: 3px double #333;
+    display: inline-block;
+}
+
+/* メタ情報セクション */
+.meta {
+    display: flex;
+    justify-content: space-between;
+    align-items: flex-start;
+    margin-bottom: 20px;
+}
+.client-info {
+    flex: 1;
+    padding-right: 30px;
+}
+.client-name {
+    font-size: 14pt;
+    font-weight: 700;
+    border-bottom: 1px solid #333;
+    padding-bottom: 4px;
+    margin-bottom: 6px;
+}
+.client-name .honorific {
+    font-size: 11pt;
+    font-weight: normal;
+    margin-left: 8px;
+}
+.client-address {
+    font-size: 9pt;
+    color: #555;
+    margin-bottom: 2px;
+}
+.client-person {
+    font-size: 9.5pt;
+    margin-top: 4px;
+}
+
+.estimate-meta {
+    text-align: right;
+    font-size: 9pt;
+    white-space: nowrap;
+}
+.estimate-meta table {
+    margin-left: auto;
+    border-collapse: collapse;
+}
+.estimate-meta td {
+    padding: 2px 0 2px 12px;
+}
+.estimate-meta td:first-child {
+    font-weight: 600;
+    text-align: right;
+    padding-right: 8px;
+    padding-left: 0;
+}
+
+/* 合計金額ボックス */
+.total-box {
+    border: 2px solid #333;
+    padding: 10px 20px;
+    margin-bottom: 18px;
+    display: flex;
+    align-items: baseline;
+    justify-content: center;
+    gap: 12px;
+    background: #fafafa;
+}
+.total-box .label {
+    font-size: 11pt;
+    font-weight: 600;
+}
+.total-box .amount {
+    font-size: 20pt;
+    font-weight: 700;
+}
+.total-box .tax-note {
+    font-size: 9pt;
+    color: #666;
+}
+
+/* 件名 */
+.project-name {
+    margin-bottom: 12px;
+    font-size: 10pt;
+    font-weight: 600;
+}
+
+/* 品目テーブル */
+table.items {
+    width: 100%;
+    border-collapse: collapse;
+    margin-bottom: 8px;
+}
+table.items th {
+    background: #3a3a3a;
+    color: #fff;
+    padding: 7px 8px;
+    font-size: 8.5pt;
+    font-weight: 500;
+    text-align: center;
+}
+table.items td {
+    padding: 6px 8px;
+    border-bottom: 1px solid #e0e0e0;
+    font-size: 9pt;
+}
+table.items tbody tr:nth-child(even) {
+    background: #f8f8f8;
+}
+.right {
+    text-align: right;
+}
+.center {
+    text-align: center;
+}
+
+/* 小計・税・合計 */
+.summary-wrap {
+    display: flex;
+    justify-content: flex-end;
+    margin-bottom: 20px;
+}
+.summary {
+    width: 260px;
+}
+.summary table {
+    width: 100%;
+    border-collapse: collapse;
+}
+.summary td {
+    padding: 5px 8px;
+    font-size: 9.5pt;
+    border-bottom: 1px solid #ddd;
+}
+.summary tr.total-row td {
+    border-top: 2px solid #333;
+    border-bottom: 2px solid #333;
+    font-weight: 700;
+    font-size: 11pt;
+    padding: 7px 8px;
+}
+
+/* 振込先・備考 */
+.section {
+    margin-bottom: 12px;
+}
+.section-title {
+    font-size: 9pt;
+    font-weight: 600;
+    background: #f0f0f0;
+    padding: 4px 8px;
+    border-left: 3px solid #3a3a3a;
+    margin-bottom: 6px;
+}
+.section-body {
+    padding-left: 11px;
+    font-size: 9pt;
+}
+.section-body p {
+    margin: 2px 0;
+}
+
+/* 発行元情報 */
+.company-section {
+    margin-top: 20px;
+    border-top: 1px solid #ccc;
+    padding-top: 10px;
+    display: flex;
+    justify-content: flex-end;
+    align-items: center;
+    gap: 20px;
+}
+.company-detail {
+    text-align: right;
+}
+.company-name-footer {
+    font-size: 12pt;
+    font-weight: 700;
+    margin-bottom: 3px;
+}
+.company-detail p {
+    font-size: 8.5pt;
+    color: #555;
+    margin: 1px 0;
+}
+.stamp {
+    display: inline-block;
+    width: 50px;
+    height: 50px;
+    border: 1px dashed #bbb;
+    border-radius: 50%;
+    line-height: 50px;
+    text-align: center;
+    font-size: 8pt;
+    color: #bbb;
+    flex-shrink: 0;
+}
+"""
+
 
 def format_currency(amount: int) -> str:
     """金額をカンマ区切りでフォーマット"""
     return f"¥{amount:,}"
 
 
-def generate_html(data: dict) -> str:
-    """見積書のHTMLを生成"""
+def generate_html(data: dict, inline_css: bool = True) -> str:
+    """見積書のHTMLを生成
+
+    inline_css=False のときは <style> を埋め込まない（解析済みのスタイルシートを別に渡してPDF化する場合）
+    """
     # 品目の計算
     items = data.get("items", [])
     subtotal = sum(item["quantity"] * item["unit_price"] for item in items)
@@ -102,236 +343,13 @@ def generate_html(data: dict) -> str:
     # 件名
     project_html = f'<div class="project-name">件名: {project_name}</div>' if project_name else ""
 
+    style = f"<style>\n{STYLESHEET}</style>\n" if inline_css else ""
+
     html = f"""<!DOCTYPE html>
 <html lang="ja">
 <head>
 <meta charset="UTF-8">
-<style>
-    @page {{
-        size: A4;
-        margin: 18mm 15mm 15mm 15mm;
-    }}
-    * {{
-        margin: 0;
-        padding: 0;
-        box-sizing: border-box;
-    }}
-    body {{
-        font-family: "Hiragino Kaku Gothic ProN", "Hiragino Sans", "Yu Gothic", "Meiryo", sans-serif;
-        font-size: 9.5pt;
-        color: #222;
-        line-height: 1.5;
-    }}
-
-    /* ヘッダー */
-    .header {{
-        text-align: center;
-        margin-bottom: 24px;
-    }}
-    .header h1 {{
-        font-size: 22pt;
-        font-weight: 700;
-        letter-spacing: 0.6em;
-        padding-bottom: 6px;
-        border-bottom: 3px double #333;
-        display: inline-block;
-    }}
-
-    /* メタ情報セクション */
-    .meta {{
-        display: flex;
-        justify-content: space-between;
-        align-items: flex-start;
-        margin-bottom: 20px;
-    }}
-    .client-info {{
-        flex: 1;
-        padding-right: 30px;
-    }}
-    .client-name {{
-        font-size: 14pt;
-        font-weight: 700;
-        border-bottom: 1px solid #333;
-        padding-bottom: 4px;
-        margin-bottom: 6px;
-    }}
-    .client-name .honorific {{
-        font-size: 11pt;
-        font-weight: normal;
-        margin-left: 8px;
-    }}
-    .client-address {{
-        font-size: 9pt;
-        color: #555;
-        margin-bottom: 2px;
-    }}
-    .client-person {{
-        font-size: 9.5pt;
-        margin-top: 4px;
-    }}
-
-    .estimate-meta {{
-        text-align: right;
-        font-size: 9pt;
-        white-space: nowrap;
-    }}
-    .estimate-meta table {{
-        margin-left: auto;
-        border-collapse: collapse;
-    }}
-    .estimate-meta td {{
-        padding: 2px 0 2px 12px;
-    }}
-    .estimate-meta td:first-child {{
-        font-weight: 600;
-        text-align: right;
-        padding-right: 8px;
-        padding-left: 0;
-    }}
-
-    /* 合計金額ボックス */
-    .total-box {{
-        border: 2px solid #333;
-        padding: 10px 20px;
-        margin-bottom: 18px;
-        display: flex;
-        align-items: baseline;
-        justify-content: center;
-        gap: 12px;
-        background: #fafafa;
-    }}
-    .total-box .label {{
-        font-size: 11pt;
-        font-weight: 600;
-    }}
-    .total-box .amount {{
-        font-size: 20pt;
-        font-weight: 700;
-    }}
-    .total-box .tax-note {{
-        font-size: 9pt;
-        color: #666;
-    }}
-
-    /* 件名 */
-    .project-name {{
-        margin-bottom: 12px;
-        font-size: 10pt;
-        font-weight: 600;
-    }}
-
-    /* 品目テーブル */
-    table.items {{
-        width: 100%;
-        border-collapse: collapse;
-        margin-bottom: 8px;
-    }}
-    table.items th {{
-        background: #3a3a3a;
-        color: #fff;
-        padding: 7px 8px;
-        font-size: 8.5pt;
-        font-weight: 500;
-        text-align: center;
-    }}
-    table.items td {{
-        padding: 6px 8px;
-        border-bottom: 1px solid #e0e0e0;
-        font-size: 9pt;
-    }}
-    table.items tbody tr:nth-child(even) {{
-        background: #f8f8f8;
-    }}
-    .right {{
-        text-align: right;
-    }}
-    .center {{
-        text-align: center;
-    }}
-
-    /* 小計・税・合計 */
-    .summary-wrap {{
-        display: flex;
-        justify-content: flex-end;
-        margin-bottom: 20px;
-    }}
-    .summary {{
-        width: 260px;
-    }}
-    .summary table {{
-        width: 100%;
-        border-collapse: collapse;
-    }}
-    .summary td {{
-        padding: 5px 8px;
-        font-size: 9.5pt;
-        border-bottom: 1px solid #ddd;
-    }}
-    .summary tr.total-row td {{
-        border-top: 2px solid #333;
-        border-bottom: 2px solid #333;
-        font-weight: 700;
-        font-size: 11pt;
-        padding: 7px 8px;
-    }}
-
-    /* 振込先・備考 */
-    .section {{
-        margin-bottom: 12px;
-    }}
-    .section-title {{
-        font-size: 9pt;
-        font-weight: 600;
-        background: #f0f0f0;
-        padding: 4px 8px;
-        border-left: 3px solid #3a3a3a;
-        margin-bottom: 6px;
-    }}
-    .section-body {{
-        padding-left: 11px;
-        font-size: 9pt;
-    }}
-    .section-body p {{
-        margin: 2px 0;
-    }}
-
-    /* 発行元情報 */
-    .company-section {{
-        margin-top: 20px;
-        border-top: 1px solid #ccc;
-        padding-top: 10px;
-        display: flex;
-        justify-content: flex-end;
-        align-items: center;
-        gap: 20px;
-    }}
-    .company-detail {{
-        text-align: right;
-    }}
-    .company-name-footer {{
-        font-size: 12pt;
-        font-weight: 700;
-        margin-bottom: 3px;
-    }}
-    .company-detail p {{
-        font-size: 8.5pt;
-        color: #555;
-        margin: 1px 0;
-    }}
-    .stamp {{
-        display: inline-block;
-        width: 50px;
-        height: 50px;
-        border: 1px dashed #bbb;
-        border-radius: 50%;
-        line-height: 50px;
-        text-align: center;
-        font-size: 8pt;
-        color: #bbb;
-        flex-shrink: 0;
-    }}
-</style>
-</head>
+{style}</head>
 <body>
     <div class="header">
         <h1>見 積 書</h1>
@@ -414,14 +432,35 @@ def generate_html(data: dict) -> str:
     return html
 
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python generate_estimate_pdf.py input.json [output.pdf]")
-        sys.exit(1)
+@lru_cache(maxsize=1)
+def load_renderer():
+    """WeasyPrintの読み込み・フォント設定・スタイルシートの解析を1プロセスにつき1回だけ行う"""
+    from weasyprint import CSS, HTML
+    from weasyprint.text.fonts import FontConfiguration
+
+    font_config = FontConfiguration()
+    stylesheet = CSS(string=STYLESHEET, font_config=font_config)
+    return HTML, stylesheet, font_config
+
+
+def render_pdf(html: str, output_file: Path, inline_css: bool = False) -> None:
+    """HTMLをPDFに書き出す
 
-    input_file = Path(sys.argv[1])
-    output_file = Path(sys.argv[2]) if len(sys.argv) > 2 else input_file.with_suffix(".pdf")
+    html が generate_html(data, inline_css=False) の出力なら、解析済みのスタイルシートを当てる。
+    スタイルを埋め込んだHTML（inline_css=True）はそのまま描画する。
+    """
+    HTML, stylesheet, font_config = load_renderer()
+    stylesheets = [] if inline_css else [stylesheet]
+    HTML(string=html).write_pdf(str(output_file), stylesheets=stylesheets, font_config=font_config)
 
+
+def print_weasyprint_missing(command: str) -> None:
+    print("weasyprint が見つかりません。")
+    print(f"PDF生成するには: uv run --with weasyprint python generate_estimate_pdf.py {command}")
+
+
+def generate_one(input_file: Path, output_file: Path) -> None:
+    """1件の input.json からPDFを生成（HTMLもフォールバック用に保存）"""
     with open(input_file, encoding="utf-8") as f:
         data = json.load(f)
 
@@ -433,12 +472,11 @@ def main():
         f.write(html)
 
     try:
-        from weasyprint import HTML
-        HTML(string=html).write_pdf(str(output_file))
+        render_pdf(html, output_file, inline_css=True)
         print(f"PDF生成完了: {output_file}")
     except ImportError:
-        print(f"weasyprint が見つかりません。HTMLファイルを保存しました: {html_path}")
-        print("PDF生成するには: uv run --with weasyprint python generate_estimate_pdf.py input.json")
+        print_weasyprint_missing("input.json")
+        print(f"HTMLファイルは保存済みです: {html_path}")
         sys.exit(1)
     except Exception as e:
         print(f"PDF生成でエラーが発生しました: {e}")
@@ -447,5 +485,202 @@ def main():
         sys.exit(1)
 
 
+# ---- バッチモード ----
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^\w.-]", "_", name).strip("._") or "estimate"
+
+
+def read_batch(source: str) -> list[tuple[str, dict | str]]:
+    """バッチの入力を (名前, データ) のリストで返す
+
+    source がディレクトリなら中の *.json を、それ以外は1行1件のJSONL（"-" は標準入力）を読む。
+    名前はディレクトリなら入力ファイル名、JSONLなら見積番号（なければ行番号）。
+    読めなかった入力はデータの代わりにエラーメッセージを入れて返す（バッチ全体は止めない）。
+    JSONLそのものを開けないときは OSError を送出する。
+    """
+    entries = []
+    path = Path(source)
+    if source != "-" and path.is_dir():
+        for input_file in sorted(path.glob("*.json")):
+            try:
+                with open(input_file, encoding="utf-8") as f:
+                    entries.append((input_file.stem, json.load(f)))
+            except (OSError, ValueError) as e:
+                entries.append((input_file.stem, f"入力を読めません: {e}"))
+    else:
+        stream = sys.stdin if source == "-" else open(path, encoding="utf-8")
+        with stream:
+            for lineno, line in enumerate(stream, 1):
+                if not line.strip():
+                    continue
+                name = f"line{lineno:05d}"
+                try:
+                    data = json.loads(line)
+                    name = str(data.get("estimate_number") or name)
+                    entries.append((name, data))
+                except (ValueError, AttributeError) as e:
+                    entries.append((name, f"{lineno}行目を読めません: {e}"))
+
+    # 出力ファイル名が重複しないようにする
+    seen: dict[str, int] = {}
+    unique = []
+    for name, data in entries:
+        name = _safe_name(name)
+        seen[name] = seen.get(name, 0) + 1
+        unique.append((name if seen[name] == 1 else f"{name}-{seen[name]}", data))
+    return unique
+
+
+def failed_entry(name: str, data: dict | str, out_dir: Path, error: str) -> dict:
+    """PDFにできなかった1件の結果。入力が読めていればHTMLを残す（ブラウザで「PDFとして印刷」で代用できる）"""
+    output_file = out_dir / f"{name}.pdf"
+    result = {"name": name, "output": str(output_file), "ok": False, "html_ms": 0.0, "pdf_ms": 0.0, "error": error}
+    if isinstance(data, str):
+        result["error"] = data
+        return result
+    try:
+        html_path = output_file.with_suffix(".html")
+        html_path.write_text(generate_html(data), encoding="utf-8")
+        result["error"] = f"{error}（HTML: {html_path}）"
+    except Exception as e:
+        result["error"] = f"{error}（HTMLも生成できません: {e!r}）"
+    return result
+
+
+def render_entry(name: str, data: dict | str, out_dir: Path) -> dict:
+    """1件をPDF化して結果（所要時間・エラー）を返す。例外は外に出さない"""
+    if isinstance(data, str):
+        return failed_entry(name, data, out_dir, data)
+    output_file = out_dir / f"{name}.pdf"
+    result = {"name": name, "output": str(output_file), "ok": False, "html_ms": 0.0, "pdf_ms": 0.0, "error": None}
+
+    start = time.perf_counter()
+    try:
+        html = generate_html(data, inline_css=False)
+    except Exception as e:
+        result["error"] = f"HTML生成でエラー: {e!r}"
+        return result
+    rendered = time.perf_counter()
+    result["html_ms"] = (rendered - start) * 1000
+
+    try:
+        render_pdf(html, output_file)
+        result["ok"] = True
+    except Exception as e:
+        failed = failed_entry(name, data, out_dir, f"PDF生成でエラー: {e!r}")
+        result["error"] = failed["error"]
+    result["pdf_ms"] = (time.perf_counter() - rendered) * 1000
+    return result
+
+
+def run_batch(source: str, out_dir: Path, jobs: int, report: Path | None) -> int:
+    """複数の見積書をまとめてPDF化し、失敗した件数を返す
+
+    jobs=1 なら1つのプロセスで順に、2以上ならプロセスプールで並列に処理する。
+    どちらもWeasyPrintの読み込みとスタイルシートの解析はプロセスごとに1回だけ。
+    WeasyPrintが使えない（pango が読み込めないなど）場合や、ワーカーが異常終了した場合も
+    途中で止めずに、該当する見積書をすべて失敗として記録しHTMLを残す。
+    """
+    try:
+        entries = read_batch(source)
+    except OSError as e:
+        print(f"入力を読めません: {e}")
+        sys.exit(1)
+    if not entries:
+        print(f"入力がありません: {source}")
+        return 0
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    results: dict[int, dict] = {}
+
+    def record(index: int, result: dict) -> None:
+        results[index] = result
+        took = result["html_ms"] + result["pdf_ms"]
+        if result["ok"]:
+            print(f"[{len(results)}/{len(entries)}] OK   {result['name']} ({took:.0f} ms)")
+        else:
+            print(f"[{len(results)}/{len(entries)}] FAIL {result['name']}: {result['error']}")
+
+    # 親プロセスで一度読み込んでみて、WeasyPrintが使えるかを先に確かめる
+    try:
+        load_renderer()
+        renderer_error = None
+        print(f"準備完了（WeasyPrint・フォント・スタイルシート）: {(time.perf_counter() - start) * 1000:.0f} ms")
+    except ImportError:
+        print_weasyprint_missing("--batch <入力>")
+        renderer_error = "weasyprint が見つかりません"
+    except Exception as e:
+        print(f"WeasyPrintを読み込めません: {e}")
+        renderer_error = f"WeasyPrintを読み込めません: {e!r}"
+
+    if renderer_error is not None:
+        for index, (name, data) in enumerate(entries):
+            record(index, failed_entry(name, data, out_dir, renderer_error))
+    elif jobs <= 1:
+        for index, (name, data) in enumerate(entries):
+            record(index, render_entry(name, data, out_dir))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=load_renderer) as pool:
+            futures = {
+                pool.submit(render_entry, name, data, out_dir): index for index, (name, data) in enumerate(entries)
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    result = future.result()
+                except BrokenProcessPool as e:
+                    # ワーカーが落ちると、処理中・未処理の見積書はすべてここに来る
+                    name, data = entries[index]
+                    result = failed_entry(name, data, out_dir, f"ワーカーが異常終了しました: {e!r}")
+                record(index, result)
+    elapsed = time.perf_counter() - start
+
+    ordered = [results[index] for index in sorted(results)]
+    ok = [r for r in ordered if r["ok"]]
+    failed = [r for r in ordered if not r["ok"]]
+    print(f"\n{len(ok)}/{len(ordered)}件 成功、{len(failed)}件 失敗（{elapsed:.1f} 秒、{len(ordered) / elapsed:.1f} 件/秒）")
+    if ok:
+        pdf_ms = [r["pdf_ms"] for r in ok]
+        print(f"PDF生成: 中央値 {statistics.median(pdf_ms):.0f} ms、最大 {max(pdf_ms):.0f} ms")
+    for r in failed:
+        print(f"  失敗: {r['name']}: {r['error']}")
+
+    if report is not None:
+        # 入力と同じ順で書く
+        with open(report, "w", encoding="utf-8") as f:
+            for r in ordered:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+        print(f"結果: {report}")
+    return len(failed)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="見積書PDF生成",
+        usage="%(prog)s input.json [output.pdf]\n"
+        "       %(prog)s --batch <ディレクトリ | inputs.jsonl | -> [--out-dir DIR] [--jobs N] [--report FILE]",
+    )
+    parser.add_argument("input", nargs="?", type=Path, help="見積書のJSON")
+    parser.add_argument("output", nargs="?", type=Path, help="出力するPDF（省略時は input と同じ名前）")
+    parser.add_argument("--batch", metavar="SOURCE", help="*.json のあるディレクトリか、1行1件のJSONL（- で標準入力）")
+    parser.add_argument("--out-dir", type=Path, help="バッチの出力先（省略時はディレクトリ入力ならそこ、JSONLならカレント）")
+    parser.add_argument("--jobs", type=int, default=1, help="バッチの並列プロセス数（1なら1プロセスで順に処理）")
+    parser.add_argument("--report", type=Path, help="1件ごとの結果（所要時間・エラー）を書き出すJSONL")
+    args = parser.parse_args()
+
+    if args.batch:
+        source_dir = Path(args.batch) if args.batch != "-" and Path(args.batch).is_dir() else Path(".")
+        failed = run_batch(args.batch, args.out_dir or source_dir, args.jobs, args.report)
+        sys.exit(1 if failed else 0)
+
+    if args.input is None:
+        parser.print_usage()
+        sys.exit(1)
+    generate_one(args.input, args.output or args.input.with_suffix(".pdf"))
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,75 @@
+import asyncio
+import os
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+from climate import CALENDAR_DAYS, CLIMATE_VARIABLES
+
+# この日数以上の値がそろっていない年は書き込まない（アーカイブの反映待ちの年を固定しないため）
+MIN_COMPLETE_DAYS = 365
+
+
+class ArchiveStore:
+    """地点・年ごとの日別の過去データを、圧縮した .npz ファイルで持つ。
+
+    ファイルは root/<緯度>_<経度>/<年>.npz で、項目ごとに 366 日分の float32 の配列を持つ。
+    座標は小数第 2 位（約 1 km）で丸めてまとめる。過ぎた年の値は変わらないので期限はなく、
+    一度取得した年は取り直さない。書き込みは一時ファイルから置き換えるので、
+    同じディレクトリを使う別のワーカーが書きかけのファイルを読むことはない。
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.reads = 0
+        self.writes = 0
+        self.corrupt = 0
+
+    def path(self, latitude: float, longitude: float, year: int) -> Path:
+        return self.root / f"{latitude:.2f}_{longitude:.2f}" / f"{year}.npz"
+
+    async def load(self, latitude: float, longitude: float, years: range) -> dict[int, dict[str, np.ndarray]]:
+        """years のうちファイルがある年を {年: {項目: 配列}} で返す。"""
+        return await asyncio.to_thread(self._load, latitude, longitude, years)
+
+    async def save(self, latitude: float, longitude: float, by_year: dict[int, dict[str, np.ndarray]]) -> None:
+        """値がそろっている年だけを書き込む。"""
+        await asyncio.to_thread(self._save, latitude, longitude, by_year)
+
+    def _load(self, latitude: float, longitude: float, years: range) -> dict[int, dict[str, np.ndarray]]:
+        found = {}
+        for year in years:
+            path = self.path(latitude, longitude, year)
+            try:
+                with np.load(path) as data:
+                    arrays = {name: data[name] for name in CLIMATE_VARIABLES}
+            except FileNotFoundError:
+                continue
+            except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+                # 壊れたファイルは消して取り直す
+                self.corrupt += 1
+                path.unlink(missing_ok=True)
+                continue
+            if any(values.shape != (CALENDAR_DAYS,) for values in arrays.values()):
+                self.corrupt += 1
+                path.unlink(missing_ok=True)
+                continue
+            found[year] = arrays
+            self.reads += 1
+        return found
+
+    def _save(self, latitude: float, longitude: float, by_year: dict[int, dict[str, np.ndarray]]) -> None:
+        for year, arrays in by_year.items():
+            if any(np.count_nonzero(~np.isnan(values)) < MIN_COMPLETE_DAYS for values in arrays.values()):
+                continue
+            path = self.path(latitude, longitude, year)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "wb") as f:
+                np.savez_compressed(f, **{name: arrays[name].astype(np.float32) for name in CLIMATE_VARIABLES})
+            os.replace(tmp, path)
+            self.writes += 1
+
+    def stats(self) -> dict:
+        return {"reads": self.reads, "writes": self.writes, "corrupt": self.corrupt}
@@ -0,0 +1,235 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+# 「見つからなかった」ことをキャッシュするための番兵
+NOT_FOUND = object()
+
+
+class TTLCache:
+    """サイズ上限付きの LRU キャッシュ。エントリごとに有効期限（秒）を持つ。
+
+    上限を超えると最も長く使われていないエントリから追い出す。
+    ヒット・ミス・追い出し件数を数えておき、stats() で返す。
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 3600.0,
+        negative_ttl: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if maxsize < 1:
+            raise ValueError("maxsize は 1 以上を指定してください。")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        item = self._data.get(key)
+        return item is not None and item[0] > self._clock()
+
+    def get(self, key: Hashable) -> Any | None:
+        """値を返す。未登録・期限切れなら None。NOT_FOUND もそのまま返す。"""
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, value = item
+        if expires_at <= self._clock():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        if value is NOT_FOUND:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return value
+
+    def peek(self, key: Hashable) -> Any | None:
+        """get と同じだが、統計にも LRU の順序にも影響しない。"""
+        item = self._data.get(key)
+        if item is None or item[0] <= self._clock():
+            return None
+        return item[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        if ttl is None:
+            ttl = self.negative_ttl if value is NOT_FOUND else self.ttl
+        self._data[key] = (self._clock() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+        }
+
+
+class StaleWhileRevalidateCache:
+    """期限切れでもしばらくは古い値を即座に返し、裏で取り直すキャッシュ。
+
+    エントリは ttl 秒のあいだ新鮮で、その後 stale_ttl 秒のあいだは古い値を返しつつ
+    バックグラウンドのタスクで更新する。それも過ぎたら呼び出し元が取得を待つ。
+    error_ttl を指定すると、さらにその秒数まで値を残しておき、取得が失敗したときだけ返す。
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 512,
+        stale_ttl: float = 3600.0,
+        error_ttl: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.stale_ttl = stale_ttl
+        self.error_ttl = error_ttl
+        self._clock = clock
+        self._entries = TTLCache(maxsize=maxsize, clock=clock)
+        self._refreshing: dict[Hashable, asyncio.Task] = {}
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.error_hits = 0
+
+    async def get_or_fetch(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl: float,
+    ) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            fresh_until, stale_until, value = entry
+            now = self._clock()
+            if now < fresh_until:
+                self.fresh_hits += 1
+                return value
+            if now < stale_until:
+                self.stale_hits += 1
+                self._revalidate(key, fetch, ttl)
+                return value
+
+        self.misses += 1
+        try:
+            fetched = await fetch()
+        except Exception:
+            if entry is None:
+                raise
+            self.error_hits += 1
+            return entry[2]
+        self.set(key, fetched, ttl)
+        return fetched
+
+    def peek(self, key: Hashable) -> tuple[Any, bool] | None:
+        """取得はせずに (値, 新鮮かどうか) を返す。エントリがなければ None。"""
+        entry = self._entries.get(key)
+        now = self._clock()
+        if entry is None or now >= entry[1]:
+            self.misses += 1
+            return None
+        fresh_until, _, value = entry
+        fresh = now < fresh_until
+        if fresh:
+            self.fresh_hits += 1
+        else:
+            self.stale_hits += 1
+        return value, fresh
+
+    def fresh_for(self, key: Hashable) -> float | None:
+        """あと何秒新鮮か（期限切れなら 0 以下）。エントリがなければ None。統計には数えない。"""
+        entry = self._entries.peek(key)
+        if entry is None:
+            return None
+        return entry[0] - self._clock()
+
+    def fallback(self, key: Hashable) -> Any | None:
+        """取得に失敗したときの代わりに、期限に関係なく残っている値を返す。なければ None。"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self.error_hits += 1
+        return entry[2]
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        now = self._clock()
+        self._entries.set(
+            key,
+            (now + ttl, now + ttl + self.stale_ttl, value),
+            ttl=ttl + self.stale_ttl + self.error_ttl,
+        )
+
+    def refresh_in_background(self, key: Hashable, refresh: Callable[[], Awaitable[Any]]) -> None:
+        """refresh() をバックグラウンドで実行する。同じ key の更新が実行中なら何もしない。"""
+        if key in self._refreshing:
+            return
+
+        async def run():
+            try:
+                await refresh()
+                self.refreshes += 1
+            except Exception:
+                # 取り直しに失敗しても古い値を返し続ける。次のアクセスで再試行する。
+                self.refresh_errors += 1
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(run())
+
+    def _revalidate(self, key: Hashable, fetch: Callable[[], Awaitable[Any]], ttl: float) -> None:
+        async def refresh():
+            self.set(key, await fetch(), ttl)
+
+        self.refresh_in_background(key, refresh)
+
+    async def close(self) -> None:
+        """実行中の更新タスクを止める。HTTP クライアントを閉じる前に呼ぶ。"""
+        tasks = list(self._refreshing.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        lookups = self.fresh_hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "fresh_hits": self.fresh_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "error_hits": self.error_hits,
+            "evictions": self._entries.evictions,
+            "hit_ratio": (self.fresh_hits + self.stale_hits) / lookups if lookups else 0.0,
+        }
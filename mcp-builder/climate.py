@@ -0,0 +1,111 @@
+import numpy as np
+
+# 平年値を計算する日別の項目（Open-Meteo の archive API の daily）
+CLIMATE_VARIABLES = ("temperature_2m_max", "temperature_2m_min", "precipitation_sum")
+# 降水量は合計で、それ以外は平均で期間をまとめる
+SUM_VARIABLES = ("precipitation_sum",)
+
+# 2/29 を含む 366 日の暦。平年は 2/29（通し番号 59）を欠測として扱う。
+CALENDAR_DAYS = 366
+FEB_29 = 59
+# 平年値は前後この日数を含めた窓でならし、年ごとのばらつきで日ごとの値がぶれないようにする
+SMOOTHING_DAYS = 7
+
+
+def calendar_index(dates: np.ndarray) -> np.ndarray:
+    """datetime64[D] の配列を、366 日の暦の通し番号（0〜365）にする。平年の 3/1 以降は 1 つずらす。"""
+    years = dates.astype("datetime64[Y]")
+    day = (dates - years.astype("datetime64[D]")).astype(int)
+    year = years.astype(int) + 1970
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    return day + (~leap & (day >= FEB_29))
+
+
+def split_years(daily: dict) -> dict[int, dict[str, np.ndarray]]:
+    """archive API の daily を、年ごと・項目ごとの 366 日の配列（float32、欠測は nan）に分ける。"""
+    times = np.array(daily["time"], dtype="datetime64[D]")
+    if times.size == 0:
+        return {}
+    year = times.astype("datetime64[Y]").astype(int) + 1970
+    years, row = np.unique(year, return_inverse=True)
+    column = calendar_index(times)
+
+    grids = {}
+    for name in CLIMATE_VARIABLES:
+        grid = np.full((years.size, CALENDAR_DAYS), np.nan, dtype=np.float32)
+        # null は nan になる
+        grid[row, column] = np.array(daily[name], dtype=float)
+        grids[name] = grid
+    return {int(y): {name: grids[name][i] for name in CLIMATE_VARIABLES} for i, y in enumerate(years)}
+
+
+def _window_sum(values: np.ndarray, half: int) -> np.ndarray:
+    """暦の両端をつないだうえで、各日の前後 half 日を含む合計を累積和で求める。"""
+    padded = np.concatenate([values[-half:], values, values[:half]])
+    total = np.concatenate([[0.0], np.cumsum(padded)])
+    return total[2 * half + 1:] - total[: -2 * half - 1]
+
+
+def normals(stack: dict[str, np.ndarray], smoothing: int = SMOOTHING_DAYS) -> dict[str, dict[str, np.ndarray]]:
+    """年 × 366 日の配列から、日ごとの平年値（mean）と標準偏差（std）を求める。
+
+    各日の値は、全年の前後 smoothing 日ぶんを 1 つの標本として扱う。
+    年ごとのループはなく、欠測（nan）は標本から除く。
+    """
+    result = {}
+    for name, values in stack.items():
+        values = values.astype(float)
+        valid = ~np.isnan(values)
+        count = _window_sum(valid.sum(axis=0).astype(float), smoothing)
+        total = _window_sum(np.nansum(values, axis=0), smoothing)
+        squares = _window_sum(np.nansum(values**2, axis=0), smoothing)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / count
+            variance = np.maximum(squares / count - mean**2, 0) * count / (count - 1)
+        result[name] = {"mean": mean, "std": np.sqrt(variance)}
+    return result
+
+
+def _number(value: float) -> float | None:
+    return None if np.isnan(value) else round(float(value), 2)
+
+
+def compare(daily: dict, normal: dict[str, dict[str, np.ndarray]]) -> tuple[list[dict], dict]:
+    """/forecast の daily を平年値と比べ、日ごとの平年差と期間全体のまとめを返す。
+
+    日ごとの行は項目ごとに value（予報）・normal（平年値）・anomaly（平年差）・z（平年差 ÷ 標準偏差）を持つ。
+    まとめは降水量が期間の合計、それ以外が期間の平均。
+    """
+    times = np.array(daily["time"], dtype="datetime64[D]")
+    index = calendar_index(times)
+
+    columns, summary = {}, {}
+    for name, stats in normal.items():
+        value = np.array(daily[name], dtype=float)
+        mean = stats["mean"][index]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            z = (value - mean) / stats["std"][index]
+        columns[name] = (value, mean, value - mean, z)
+
+        reduce = np.nansum if name in SUM_VARIABLES else np.nanmean
+        known = ~np.isnan(value)
+        total_value = reduce(value[known]) if known.any() else np.nan
+        total_normal = reduce(mean[known]) if known.any() else np.nan
+        summary[name] = {
+            "value": _number(total_value),
+            "normal": _number(total_normal),
+            "anomaly": _number(total_value - total_normal),
+        }
+
+    rows = []
+    for i, day in enumerate(times):
+        row = {"date": str(day)}
+        for name, (value, mean, anomaly, z) in columns.items():
+            row[name] = {
+                "value": _number(value[i]),
+                "normal": _number(mean[i]),
+                "anomaly": _number(anomaly[i]),
+                "z": _number(z[i]),
+            }
+        rows.append(row)
+    return rows, summary
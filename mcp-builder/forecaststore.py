@@ -0,0 +1,186 @@
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Hashable
+
+from sqlitestore import WriteBehindStore
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS forecast (
+    key         TEXT PRIMARY KEY,
+    value       TEXT NOT NULL,
+    fresh_until REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS hot (
+    key       TEXT PRIMARY KEY,
+    score     REAL NOT NULL,
+    scored_at REAL NOT NULL,
+    location  TEXT NOT NULL,
+    params    TEXT NOT NULL,
+    ttl       REAL NOT NULL
+);
+"""
+
+_UPSERT = """
+INSERT INTO forecast (key, value, fresh_until) VALUES (?, ?, ?)
+ON CONFLICT(key) DO UPDATE SET value = excluded.value, fresh_until = excluded.fresh_until
+WHERE excluded.fresh_until > forecast.fresh_until
+"""
+
+# スコアは scored_at 時点の値。新しい方の時刻にそろえて（減衰させて）から足す。decay() は接続ごとに登録する。
+_HIT = """
+INSERT INTO hot (key, score, scored_at, location, params, ttl) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(key) DO UPDATE SET
+    score = decay(hot.score, MAX(hot.scored_at, excluded.scored_at) - hot.scored_at)
+          + decay(excluded.score, MAX(hot.scored_at, excluded.scored_at) - excluded.scored_at),
+    scored_at = MAX(hot.scored_at, excluded.scored_at),
+    location = excluded.location, params = excluded.params, ttl = MIN(hot.ttl, excluded.ttl)
+"""
+
+
+def encode_key(key: Hashable) -> str:
+    """forecast_key() のタプルを、プロセスをまたいで同じになる文字列にする。"""
+    return json.dumps(key, separators=(",", ":"), ensure_ascii=False)
+
+
+def decode_key(encoded: str) -> Hashable:
+    """encode_key() の逆。JSON の配列をタプルに戻す。"""
+
+    def tuples(value):
+        return tuple(tuples(v) for v in value) if isinstance(value, list) else value
+
+    return tuples(json.loads(encoded))
+
+
+class ForecastStore(WriteBehindStore):
+    """複数のワーカープロセスで予報キャッシュを共有するための SQLite ストア。
+
+    各ワーカーはメモリの予報キャッシュを持ったまま、そこに新鮮な値がないときだけ
+    ここを引く。上流から取得した値は書き込みキュー経由で書くので、他のワーカーは
+    次の問い合わせからそれを使える。古くなった値の扱いは各ワーカーのメモリキャッシュに任せ、
+    ここでは新鮮なものだけを返す。時刻はプロセス間で比べられるよう time.time() で持つ。
+
+    予報キーごとの利用頻度（半減期 halflife 秒で減衰するスコア）も全ワーカーの分をここに集め、
+    先読みを受け持つワーカーが hot() で上位を引く。スコアが forget_below を下回ったキーは整理のときに消す。
+    """
+
+    SCHEMA = _SCHEMA
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_entries: int = 20_000,
+        compact_interval: float = 600.0,
+        halflife: float = 3600.0,
+        forget_below: float = 0.5,
+    ):
+        super().__init__(path, compact_interval)
+        self.max_entries = max_entries
+        self.halflife = halflife
+        self.forget_below = forget_below
+        self.hits = 0
+        self.misses = 0
+
+    async def get_many(self, keys: list[Hashable]) -> dict[Hashable, tuple[Any, float]]:
+        """新鮮なエントリだけを {key: (値, あと何秒新鮮か)} で返す。"""
+        if not keys or self._reader is None:
+            return {}
+        found = await self._read(self._get_many, [encode_key(key) for key in keys], default={})
+        by_encoded = {encode_key(key): key for key in keys}
+        result = {by_encoded[encoded]: entry for encoded, entry in found.items()}
+        self.hits += len(result)
+        self.misses += len(keys) - len(result)
+        return result
+
+    async def get(self, key: Hashable) -> tuple[Any, float] | None:
+        return (await self.get_many([key])).get(key)
+
+    def put(self, key: Hashable, value: Any, ttl: float) -> None:
+        """取得した予報を、ttl 秒のあいだ新鮮なものとして書き込みキューに積む。"""
+        self._enqueue(("put", encode_key(key), value, time.time() + ttl))
+
+    def record_hit(self, key: Hashable, location: dict, params: dict, ttl: float) -> None:
+        """予報キーが 1 回引かれたことを書き込みキューに積む。"""
+        self._enqueue(("hit", encode_key(key), (location, params, ttl), time.time()))
+
+    async def hot(self, n: int, min_score: float) -> list[tuple[Hashable, dict, dict, float]]:
+        """全ワーカーの利用頻度で、スコアが min_score 以上のキーを高い順に (key, location, params, ttl) で n 件返す。"""
+        rows = await self._read(self._hot, n, min_score, default=[])
+        return [
+            (decode_key(key), json.loads(location), json.loads(params), ttl) for key, location, params, ttl in rows
+        ]
+
+    def _decay(self, score: float, seconds: float) -> float:
+        return score * 0.5 ** (seconds / self.halflife)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = super()._connect()
+        conn.create_function("decay", 2, self._decay, deterministic=True)
+        return conn
+
+    def _hot(self, n: int, min_score: float) -> list[tuple]:
+        return self._reader.execute(
+            "SELECT key, location, params, ttl FROM hot WHERE decay(score, ? - scored_at) >= ? "
+            "ORDER BY decay(score, ? - scored_at) DESC LIMIT ?",
+            (time.time(), min_score, time.time(), n),
+        ).fetchall()
+
+    def _get_many(self, encoded: list[str]) -> dict[str, tuple[Any, float]]:
+        now = time.time()
+        rows = self._reader.execute(
+            f"SELECT key, value, fresh_until FROM forecast "
+            f"WHERE key IN ({','.join('?' * len(encoded))}) AND fresh_until > ?",
+            (*encoded, now),
+        ).fetchall()
+        return {key: (json.loads(value), fresh_until - now) for key, value, fresh_until in rows}
+
+    def _write_batch(self, batch: list[tuple]) -> None:
+        rows = []
+        # 同じキーへのヒットはまとめて 1 行にする（最後のヒットの時刻でのスコア）
+        hits: dict[str, list] = {}
+        for op, key, value, at in batch:
+            if op == "put":
+                rows.append((key, json.dumps(value, separators=(",", ":")), at))
+                continue
+            hit = hits.get(key)
+            if hit is None:
+                hits[key] = [1.0, at, value]
+            else:
+                latest = max(hit[1], at)
+                hit[0] = self._decay(hit[0], latest - hit[1]) + self._decay(1.0, latest - at)
+                hit[1] = latest
+                hit[2] = value
+        hot_rows = [
+            (key, score, at, json.dumps(location, ensure_ascii=False), json.dumps(params, ensure_ascii=False), ttl)
+            for key, (score, at, (location, params, ttl)) in hits.items()
+        ]
+        with self._conn:
+            self._conn.executemany(_UPSERT, rows)
+            self._conn.executemany(_HIT, hot_rows)
+
+    def _compact(self) -> None:
+        now = time.time()
+        with self._conn:
+            self._conn.execute("DELETE FROM forecast WHERE fresh_until < ?", (now,))
+            self._conn.execute(
+                "DELETE FROM forecast WHERE key NOT IN "
+                "(SELECT key FROM forecast ORDER BY fresh_until DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self._conn.execute("DELETE FROM hot WHERE decay(score, ? - scored_at) < ?", (now, self.forget_below))
+            self._conn.execute(
+                "DELETE FROM hot WHERE key NOT IN "
+                "(SELECT key FROM hot ORDER BY decay(score, ? - scored_at) DESC LIMIT ?)",
+                (now, self.max_entries),
+            )
+        self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "dropped_writes": self.dropped_writes,
+            "failed_writes": self.failed_writes,
+            "read_errors": self.read_errors,
+        }
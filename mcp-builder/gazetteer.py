@@ -0,0 +1,64 @@
+from pathlib import Path
+
+from normalize import normalize_city
+
+DEFAULT_PATH = Path(__file__).with_name("data") / "gazetteer.tsv"
+
+
+class Gazetteer:
+    """同梱の都市データ（data/gazetteer.tsv）から座標を引くオフライン辞書。
+
+    都市名と別名（かな・ローマ字・英語名）を正規化したキーから地点を引く。
+    同じキーを持つ地点が複数あるときは、ファイルで先に出てくるほうを返す。
+    """
+
+    def __init__(self, entries: list[dict], aliases: list[tuple[str, int]]):
+        self._entries = entries
+        self._index: dict[str, int] = {}
+        for key, index in aliases:
+            self._index.setdefault(key, index)
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path: str | Path = DEFAULT_PATH) -> "Gazetteer":
+        entries: list[dict] = []
+        aliases: list[tuple[str, int]] = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                name, country, latitude, longitude, *rest = line.rstrip("\n").split("\t")
+                index = len(entries)
+                entries.append({
+                    "name": name,
+                    "country": country,
+                    "latitude": float(latitude),
+                    "longitude": float(longitude),
+                })
+                names = [name] + (rest[0].split("|") if rest and rest[0] else [])
+                for n in names:
+                    # 接尾辞に見える字で終わる地名（「甲府」など）は、外さないキーでも引けるようにする。
+                    # 「甲府市」は 1 つだけ外して「甲府」になるため。
+                    aliases.append((normalize_city(n), index))
+                    aliases.append((normalize_city(n, strip_suffix=False), index))
+        return cls(entries, aliases)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, name: str) -> dict | None:
+        """都市名・別名に完全一致する地点を返す。なければ None。"""
+        return self.lookup_key(normalize_city(name))
+
+    def lookup_key(self, key: str) -> dict | None:
+        """normalize_city 済みのキーで引く。"""
+        index = self._index.get(key)
+        if index is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._entries[index]
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "keys": len(self._index), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,138 @@
+import asyncio
+import time
+from pathlib import Path
+from typing import Any
+
+from cache import NOT_FOUND
+from sqlitestore import WriteBehindStore
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocode (
+    key        TEXT PRIMARY KEY,
+    found      INTEGER NOT NULL,
+    name       TEXT,
+    country    TEXT,
+    latitude   REAL,
+    longitude  REAL,
+    created_at REAL NOT NULL,
+    last_used  REAL NOT NULL,
+    hits       INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+_UPSERT = """
+INSERT INTO geocode (key, found, name, country, latitude, longitude, created_at, last_used, hits)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)
+ON CONFLICT(key) DO UPDATE SET
+    found = excluded.found, name = excluded.name, country = excluded.country,
+    latitude = excluded.latitude, longitude = excluded.longitude,
+    created_at = excluded.created_at, last_used = excluded.last_used
+"""
+
+_TOUCH = "UPDATE geocode SET hits = hits + ?, last_used = MAX(last_used, ?) WHERE key = ?"
+
+
+class GeocodeStore(WriteBehindStore):
+    """ジオコーディング結果を SQLite に永続化するストア。
+
+    起動時に利用頻度の高いエントリを読み出してメモリキャッシュを温め、
+    新しい解決結果やヒットはキューに積んでバックグラウンドのタスクがまとめて書き込む。
+    ツール呼び出しが SQLite への書き込みを待つことはない。
+    複数のワーカーが同じファイルを共有する場合は、メモリキャッシュにないキーを get() で引ける。
+    """
+
+    SCHEMA = _SCHEMA
+
+    def __init__(
+        self,
+        path: str | Path,
+        ttl: float,
+        negative_ttl: float,
+        max_entries: int = 50_000,
+        max_idle: float = 90 * 24 * 3600,
+        compact_interval: float = 3600.0,
+    ):
+        super().__init__(path, compact_interval)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.max_idle = max_idle
+
+    async def get(self, key: str) -> tuple[Any, float] | None:
+        """有効期限内のエントリを (値, 残り TTL) で返す。なければ None。"""
+        return await self._read(self._get, key)
+
+    async def load_hot(self, limit: int) -> list[tuple[str, Any, float]]:
+        """有効期限内のエントリをヒット数の多い順に返す。(key, 値, 残り TTL) のリスト。"""
+        return await asyncio.to_thread(self._load_hot, limit)
+
+    def put(self, key: str, value: Any) -> None:
+        """解決結果（NOT_FOUND を含む）を書き込みキューに積む。"""
+        self._enqueue(("put", key, value, time.time()))
+
+    def touch(self, key: str) -> None:
+        """メモリキャッシュでヒットしたことを記録する。"""
+        self._enqueue(("touch", key, None, time.time()))
+
+    def _row_entry(self, row: tuple, now: float) -> tuple[str, Any, float]:
+        key, found, name, country, latitude, longitude, created_at = row
+        if found:
+            value = {"name": name, "country": country, "latitude": latitude, "longitude": longitude}
+            return key, value, self.ttl - (now - created_at)
+        return key, NOT_FOUND, self.negative_ttl - (now - created_at)
+
+    def _get(self, key: str) -> tuple[Any, float] | None:
+        now = time.time()
+        row = self._reader.execute(
+            "SELECT key, found, name, country, latitude, longitude, created_at FROM geocode WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        _, value, remaining = self._row_entry(row, now)
+        return (value, remaining) if remaining > 0 else None
+
+    def _load_hot(self, limit: int) -> list[tuple[str, Any, float]]:
+        now = time.time()
+        rows = self._reader.execute(
+            "SELECT key, found, name, country, latitude, longitude, created_at FROM geocode "
+            "WHERE (found = 1 AND created_at > ?) OR (found = 0 AND created_at > ?) "
+            "ORDER BY hits DESC, last_used DESC LIMIT ?",
+            (now - self.ttl, now - self.negative_ttl, limit),
+        ).fetchall()
+        return [self._row_entry(row, now) for row in rows]
+
+    def _write_batch(self, batch: list[tuple]) -> None:
+        upserts = []
+        touches: dict[str, tuple[int, float]] = {}
+        for op, key, value, at in batch:
+            if op == "put":
+                if value is NOT_FOUND:
+                    upserts.append((key, 0, None, None, None, None, at, at))
+                else:
+                    upserts.append((
+                        key, 1, value["name"], value["country"],
+                        value["latitude"], value["longitude"], at, at,
+                    ))
+            else:
+                hits, last = touches.get(key, (0, 0.0))
+                touches[key] = (hits + 1, max(last, at))
+
+        with self._conn:
+            self._conn.executemany(_UPSERT, upserts)
+            self._conn.executemany(_TOUCH, [(hits, last, key) for key, (hits, last) in touches.items()])
+
+    def _compact(self) -> None:
+        """長く使われていないエントリ・期限切れの「見つからない」エントリを削除し、件数上限を守る。"""
+        now = time.time()
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM geocode WHERE (found = 1 AND last_used < ?) OR (found = 0 AND created_at < ?)",
+                (now - self.max_idle, now - self.negative_ttl),
+            )
+            self._conn.execute(
+                "DELETE FROM geocode WHERE key NOT IN "
+                "(SELECT key FROM geocode ORDER BY hits DESC, last_used DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+# 1 日を 6 時間ずつの時間帯に分ける
+WINDOWS = ("未明", "朝", "昼", "夜")
+WINDOW_HOURS = 24 // len(WINDOWS)
+
+# 1 時間あたりこの降水量（mm）以上、または WMO コードが霧雨以上なら「降っている」とみなす
+WET_PRECIPITATION = 0.2
+WET_WEATHER_CODE = 51
+# 3 時間でこの温度（°C）以上下がったら「気温の急降下」とみなす
+TEMP_DROP = 4.0
+TEMP_DROP_HOURS = 3
+
+
+def _series(hourly: dict, name: str) -> np.ndarray:
+    # null は nan になる
+    return np.array(hourly[name], dtype=float)
+
+
+def _local_now(data: dict) -> np.datetime64:
+    offset = timedelta(seconds=data.get("utc_offset_seconds", 0))
+    now = datetime.now(timezone.utc) + offset
+    return np.datetime64(now.replace(tzinfo=None, minute=0, second=0, microsecond=0), "m")
+
+
+def aggregate_windows(data: dict, now: np.datetime64 | None = None) -> list[dict]:
+    """/forecast の hourly を日付 × 時間帯ごとにまとめる。
+
+    時刻から時間帯の番号を作り、番号が変わる位置で ufunc.reduceat をかけるので
+    時間ごとのループはない。終わった時間帯は省く。
+    """
+    hourly = data["hourly"]
+    times = np.array(hourly["time"], dtype="datetime64[m]")
+    if times.size == 0:
+        return []
+    days = times.astype("datetime64[D]")
+    hours = (times - days).astype("timedelta64[h]").astype(int)
+    group = (days - days[0]).astype(int) * len(WINDOWS) + hours // WINDOW_HOURS
+    starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    counts = np.diff(np.r_[starts, times.size])
+
+    temperature = _series(hourly, "temperature_2m")
+    precipitation = _series(hourly, "precipitation")
+    probability = _series(hourly, "precipitation_probability")
+    wind = _series(hourly, "wind_speed_10m")
+    code = _series(hourly, "weather_code")
+
+    summary = {
+        "temp_min": np.fmin.reduceat(temperature, starts),
+        "temp_max": np.fmax.reduceat(temperature, starts),
+        "precipitation": np.add.reduceat(np.nan_to_num(precipitation), starts),
+        "probability": np.fmax.reduceat(probability, starts),
+        "wind_max": np.fmax.reduceat(wind, starts),
+        # WMO コードはおおむね大きいほど悪天候なので、時間帯で最も悪い天気を代表にする
+        "weather_code": np.fmax.reduceat(code, starts),
+    }
+    window_end = times[starts] + (WINDOW_HOURS - hours[starts] % WINDOW_HOURS) * np.timedelta64(60, "m")
+    keep = window_end > (_local_now(data) if now is None else now)
+
+    rows = []
+    for i in np.flatnonzero(keep):
+        rows.append({
+            "date": str(days[starts[i]]),
+            "window": WINDOWS[hours[starts[i]] // WINDOW_HOURS],
+            "hours": int(counts[i]),
+            **{name: (None if np.isnan(values[i]) else float(values[i])) for name, values in summary.items()},
+        })
+    return rows
+
+
+def detect_changes(data: dict, now: np.datetime64 | None = None) -> list[dict]:
+    """これからの時間について、雨の降り始め・降り止みと気温の急降下を時刻順に返す。"""
+    hourly = data["hourly"]
+    times = np.array(hourly["time"], dtype="datetime64[m]")
+    ahead = times >= (_local_now(data) if now is None else now)
+    if not ahead.any():
+        return []
+    first = int(np.argmax(ahead))
+    times = times[first:]
+
+    precipitation = np.nan_to_num(_series(hourly, "precipitation")[first:])
+    code = np.nan_to_num(_series(hourly, "weather_code")[first:])
+    temperature = _series(hourly, "temperature_2m")[first:]
+
+    changes = []
+    wet = (precipitation >= WET_PRECIPITATION) | (code >= WET_WEATHER_CODE)
+    starts = np.flatnonzero(wet[1:] & ~wet[:-1]) + 1
+    stops = np.flatnonzero(~wet[1:] & wet[:-1]) + 1
+    # 降り始めの天気は、その降っている間で最初に降水を表すコードを使う。
+    # 降水量だけが閾値を超えてコードが晴れ・曇りのままなら None（表示は単に「雨」）。
+    ends = np.append(stops, wet.size)
+    for i in starts:
+        end = ends[np.searchsorted(ends, i)]
+        coded = np.flatnonzero(code[i:end] >= WET_WEATHER_CODE)
+        weather_code = int(code[i + coded[0]]) if coded.size else None
+        changes.append({"time": str(times[i]), "kind": "rain_start", "weather_code": weather_code})
+    for i in stops:
+        changes.append({"time": str(times[i]), "kind": "rain_stop"})
+
+    if temperature.size > TEMP_DROP_HOURS:
+        delta = temperature[TEMP_DROP_HOURS:] - temperature[:-TEMP_DROP_HOURS]
+        dropping = delta <= -TEMP_DROP
+        # 続けて条件を満たす時間は、最初の 1 回だけ報告する
+        for i in np.flatnonzero(dropping & ~np.r_[False, dropping[:-1]]):
+            changes.append({
+                "time": str(times[i]),
+                "kind": "temp_drop",
+                "from": float(temperature[i]),
+                "to": float(temperature[i + TEMP_DROP_HOURS]),
+                "hours": TEMP_DROP_HOURS,
+            })
+
+    changes.sort(key=lambda change: change["time"])
+    return changes
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""Weather MCP サーバーを読み込み済みのプロセスから fork して stdio で起動する
+
+server.py をそのまま起動すると、毎回 fastmcp・httpx・numpy などの読み込みに 1 秒以上かかる。
+エージェントがセッションごとにサーバーを起動する構成では、これが最初の応答までの時間に
+そのまま乗る。
+
+zygote モードのプロセスは、あらかじめ server.py と重い依存をすべて読み込んだ状態で
+Unix ソケットを待ち受ける。connect モード（エージェントが起動するのはこちら）は標準ライブラリしか
+読み込まずにソケットへつなぎ、自分の stdin / stdout / stderr を渡す。zygote は fork した
+子プロセスでそれらを受け取って MCP サーバーを動かすので、読み込みのコストは fork 1 回分になる。
+connect は子プロセスが終わるまで待ち、その終了コードで終わる。受け取ったシグナルは子プロセスへ送る。
+
+zygote が動いていなければ、connect はその場で server.py を起動する（普通に起動するのと同じ）。
+ソケットは自分専用（0700）のディレクトリに置き、connect は相手のプロセスが同じユーザーで
+動いていることを確かめてから stdio を渡す。
+設定の環境変数（WEATHER_*）は server.py を読み込んだ時点で決まるので、zygote を起動するときに渡す。
+
+Usage:
+    python launcher.py zygote &
+    python launcher.py connect          # MCP クライアントの設定ではこちらを起動する
+    python launcher.py zygote --socket "$XDG_RUNTIME_DIR/weather-mcp/zygote.sock"   # 親は自分専用（0700）のディレクトリ
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import stat
+import struct
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+# $XDG_RUNTIME_DIR がなければ、一時ディレクトリの下にユーザーごとのディレクトリを作って使う
+DEFAULT_SOCKET = os.environ.get("WEATHER_LAUNCHER_SOCKET") or str(
+    Path(os.environ.get("XDG_RUNTIME_DIR") or Path(tempfile.gettempdir()) / f"weather-mcp-{os.getuid()}")
+    / "weather-mcp.sock"
+)
+# zygote で先に読み込んでおくモジュール。server.py が使うときまで読み込みを遅らせているものと、
+# 依存ライブラリが lifespan や最初のツール呼び出しで初めて読み込むもの（python -X importtime で調べた）。
+# fastmcp の内部のモジュールはバージョンによってないことがあるので、読み込めなければ飛ばす。
+WARM_MODULES = (
+    "hourly",
+    "climate",
+    "archivestore",
+    "httpcore",
+    "h11",
+    "anyio._backends._asyncio",
+    "concurrent.futures.thread",
+    "fastmcp.server.transforms.catalog",
+    "key_value.aio.adapters.pydantic",
+    "key_value.aio.stores.memory",
+    "fastmcp.server.providers.prefab_payload",
+    "fastmcp.server.providers.prefab_synthesis",
+)
+
+
+def private_dir(directory: Path) -> None:
+    """ソケットを置くディレクトリを自分専用（0700）で用意する。
+
+    すでにあるディレクトリが自分のものでないか、他のユーザーが読み書きできるなら PermissionError。
+    """
+    try:
+        directory.mkdir(mode=0o700, parents=True)
+    except FileExistsError:
+        pass
+    st = os.lstat(directory)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(f"{directory} は自分専用（所有者が自分で 0700）のディレクトリではありません。")
+
+
+def _peer_uid(sock: socket.socket) -> int | None:
+    """Unix ソケットの相手プロセスのユーザー ID。SO_PEERCRED がない OS では None。"""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    _, uid, _ = struct.unpack("3i", creds)
+    return uid
+
+
+def _exec_server(launched_at: float) -> None:
+    """zygote を使わずに server.py を起動する。戻らない。"""
+    os.environ["WEATHER_LAUNCH_TIME"] = repr(launched_at)
+    server = str(HERE / "server.py")
+    os.execv(sys.executable, [sys.executable, server])
+
+
+def connect(path: str) -> int:
+    """zygote に stdio を渡してサーバーを起動させ、その終了コードを返す。"""
+    launched_at = time.time()
+    try:
+        private_dir(Path(path).parent)
+    except OSError as e:
+        print(f"launcher: zygote を使わずに起動します: {e}", file=sys.stderr)
+        _exec_server(launched_at)
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        _exec_server(launched_at)
+
+    # 他のユーザーのプロセスには stdio を渡さない
+    uid = _peer_uid(sock)
+    if uid is not None and uid != os.getuid():
+        sock.close()
+        print(f"launcher: {path} の相手が別のユーザー（uid {uid}）なので、zygote を使わずに起動します。", file=sys.stderr)
+        _exec_server(launched_at)
+
+    request = json.dumps({"launched_at": launched_at}).encode()
+    socket.send_fds(sock, [request], [0, 1, 2])
+    reader = sock.makefile("rb")
+    line = reader.readline()
+    if not line.strip():
+        print("launcher: zygote がサーバーを起動できませんでした。", file=sys.stderr)
+        return 1
+    pid = int(line)
+
+    def forward(signum, frame):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+        signal.signal(signum, forward)
+
+    # 子プロセスが終了コードを 1 行書いて閉じる。何も書かずに閉じたら異常終了とみなす。
+    status = reader.readline()
+    return int(status) if status.strip() else 1
+
+
+def _serve_session(conn: socket.socket, fds: list[int], request: dict) -> None:
+    """fork した子プロセスで、受け取った stdio を使って MCP サーバーを動かす。戻らない。"""
+    import random
+
+    import server
+
+    code = 1
+    try:
+        os.setsid()
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        # 乱数の状態は fork 元と同じなので、再試行の待ち時間が全セッションで揃わないよう混ぜ直す
+        random.seed()
+        server.STARTUP.reset(request["launched_at"])
+        server.STARTUP.mark("imported")
+        conn.sendall(f"{os.getpid()}\n".encode())
+        server.mcp.run()
+        code = 0
+    except KeyboardInterrupt:
+        code = 130
+    except BaseException:
+        import traceback
+
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            conn.sendall(f"{code}\n".encode())
+        except OSError:
+            pass
+        os._exit(code)
+
+
+def zygote(path: str) -> None:
+    """server.py を読み込んでから path で待ち受け、接続ごとに fork してサーバーを動かす。"""
+    import importlib
+
+    start = time.perf_counter()
+    sys.path.insert(0, str(HERE))
+    import server  # noqa: F401
+
+    for name in WARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+    loaded_ms = (time.perf_counter() - start) * 1000
+
+    private_dir(Path(path).parent)
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # 作った瞬間から 0600 になるよう、umask を絞ってから bind する
+    umask = os.umask(0o177)
+    try:
+        listener.bind(path)
+    finally:
+        os.umask(umask)
+    listener.listen(64)
+    # 終わった子プロセスはカーネルに回収させる。SIGTERM でもソケットを片付けて終わる。
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"zygote: {path} で待ち受けています（読み込み {loaded_ms:.0f} ms）", file=sys.stderr)
+
+    sessions = 0
+    try:
+        while True:
+            conn, _ = listener.accept()
+            try:
+                message, fds, _, _ = socket.recv_fds(conn, 4096, 3)
+                if len(fds) != 3:
+                    raise ValueError("stdin / stdout / stderr の 3 つを渡してください。")
+                request = json.loads(message)
+            except (OSError, ValueError) as e:
+                print(f"zygote: 不正な接続を閉じます: {e}", file=sys.stderr)
+                conn.close()
+                continue
+
+            if os.fork() == 0:
+                listener.close()
+                _serve_session(conn, fds, request)
+            for fd in fds:
+                os.close(fd)
+            conn.close()
+            sessions += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        print(f"zygote: {sessions} セッションを起動しました", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=("zygote", "connect"))
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="zygote が待ち受ける Unix ソケット")
+    args = parser.parse_args()
+
+    if args.mode == "zygote":
+        try:
+            zygote(args.socket)
+        except PermissionError as e:
+            sys.exit(f"zygote: {e}")
+    else:
+        sys.exit(connect(args.socket))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""Weather MCP サーバーの負荷試験
+
+指定したリクエストレートで MCP ツールを呼び続け（オープンループ）、スループットと
+ツールごとの p50/p95/p99 レイテンシを表示する。レイテンシは予定した送信時刻から測るので、
+サーバーが詰まって送信が遅れた分も含まれる。
+
+都市はよく引かれるものほど多くなるよう Zipf 分布で選ぶ。--mock を付けると
+mock_openmeteo.py を起動してサーバーをそちらへ向けるので、本物の API には一切アクセスしない。
+
+Usage:
+    python loadgen.py --mock --rate 50 --duration 30
+    python loadgen.py --mock --mock-latency-ms 200 --mock-error-rate 0.05 --mix current=8,multi=2
+    python loadgen.py --url http://127.0.0.1:8000/mcp --rate 200 --json result.json
+
+モックは検索と予報を同じホストで返すので、上流のレート制限（既定 10 回/秒）も 1 つにまとまる。
+制限なしで測るときは WEATHER_RATE_LIMIT=0 を付ける。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+TOOLS = {
+    "current": "get_current_weather",
+    "weekly": "get_weekly_forecast",
+    "overview": "get_weather_overview",
+    "hourly": "get_hourly_forecast",
+    "multi": "get_current_weather_multi",
+    "climate": "get_climate_comparison",
+}
+DEFAULT_MIX = "current=6,weekly=3,overview=1,multi=1"
+MULTI_CITIES = 5
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in TOOLS:
+            raise SystemExit(f"--mix: 不明なツール '{name}'（{', '.join(TOOLS)}）")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def city_pool(count: int) -> list[str]:
+    """同梱の都市データの名前と、ジオコーディングが必要な架空の都市名を混ぜる。"""
+    names = []
+    with open(HERE / "data" / "gazetteer.tsv", encoding="utf-8") as f:
+        for line in f:
+            if line.strip() and not line.startswith("#"):
+                names.append(line.split("\t", 1)[0])
+    known = names[: count // 2]
+    return known + [f"Mocktown {i}" for i in range(count - len(known))]
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = q * (len(sorted_values) - 1)
+    lo = int(rank)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (rank - lo)
+
+
+def summarize(results: dict[str, list[tuple[float, bool]]], elapsed: float, dropped: int) -> dict:
+    def row(samples: list[tuple[float, bool]]) -> dict:
+        latencies = sorted(latency for latency, _ in samples)
+        return {
+            "requests": len(samples),
+            "errors": sum(1 for _, ok in samples if not ok),
+            "rps": len(samples) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        }
+
+    everything = [sample for samples in results.values() for sample in samples]
+    return {
+        "elapsed_s": elapsed,
+        "dropped": dropped,
+        "total": row(everything),
+        "tools": {name: row(samples) for name, samples in sorted(results.items())},
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"\n{report['elapsed_s']:.1f}s, 送信できなかったリクエスト: {report['dropped']}\n")
+    print("| tool | requests | errors | rps | p50 ms | p95 ms | p99 ms | max ms |")
+    print("|------|---------:|-------:|----:|-------:|-------:|-------:|-------:|")
+    for name, row in [*report["tools"].items(), ("total", report["total"])]:
+        print(
+            f"| {name} | {row['requests']} | {row['errors']} | {row['rps']:.1f} "
+            f"| {row['p50_ms']:.1f} | {row['p95_ms']:.1f} | {row['p99_ms']:.1f} | {row['max_ms']:.1f} |"
+        )
+
+
+async def run_load(client, args) -> dict:
+    mix = parse_mix(args.mix)
+    kinds, kind_weights = list(mix), list(mix.values())
+    cities = city_pool(args.cities)
+    city_weights = [1 / (rank + 1) ** args.zipf for rank in range(len(cities))]
+    rng = random.Random(args.seed)
+
+    results: dict[str, list[tuple[float, bool]]] = {}
+    in_flight: set[asyncio.Task] = set()
+    dropped = 0
+
+    async def call(kind: str, scheduled: float) -> None:
+        if kind == "multi":
+            arguments = {"cities": rng.choices(cities, city_weights, k=MULTI_CITIES)}
+        else:
+            arguments = {"city": rng.choices(cities, city_weights)[0]}
+        ok = True
+        try:
+            result = await client.call_tool(TOOLS[kind], arguments, raise_on_error=False)
+            ok = not result.is_error
+        except Exception:
+            ok = False
+        results.setdefault(kind, []).append((time.perf_counter() - scheduled, ok))
+
+    interval = 1 / args.rate
+    start = time.perf_counter()
+    total = int(args.rate * args.duration)
+    for i in range(total):
+        scheduled = start + i * interval
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= args.max_in_flight:
+            dropped += 1
+            continue
+        task = asyncio.create_task(call(rng.choices(kinds, kind_weights)[0], scheduled))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.wait(in_flight)
+    return summarize(results, time.perf_counter() - start, dropped)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mock(args) -> subprocess.Popen:
+    """mock_openmeteo.py を起動し、サーバーが向く先を環境変数で差し替える。"""
+    port = _free_port()
+    proc = subprocess.Popen([
+        sys.executable, str(HERE / "mock_openmeteo.py"),
+        "--port", str(port),
+        "--latency-ms", str(args.mock_latency_ms),
+        "--jitter-ms", str(args.mock_jitter_ms),
+        "--error-rate", str(args.mock_error_rate),
+        "--not-found-rate", str(args.mock_not_found_rate),
+    ])
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    else:
+        proc.kill()
+        raise SystemExit("mock_openmeteo.py が起動しませんでした。")
+    base = f"http://127.0.0.1:{port}/v1"
+    os.environ["WEATHER_FORECAST_BASE"] = base
+    os.environ["WEATHER_GEOCODING_BASE"] = base
+    os.environ["WEATHER_ARCHIVE_BASE"] = base
+    return proc
+
+
+async def main_async(args) -> dict:
+    from fastmcp import Client
+
+    if args.url:
+        target = args.url
+    else:
+        # 同じプロセスでサーバーを動かす。キャッシュの永続化先は使い捨てにする。
+        os.environ.setdefault("WEATHER_GEOCODE_DB", str(Path(tempfile.mkdtemp()) / "geocode.sqlite3"))
+        sys.path.insert(0, str(HERE))
+        from server import mcp
+
+        target = mcp
+
+    async with Client(target, timeout=args.timeout) as client:
+        if args.warmup:
+            await run_load(client, argparse.Namespace(**{**vars(args), "duration": args.warmup}))
+        return await run_load(client, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="streamable-HTTP で動いているサーバーの URL。省略時は同じプロセスで起動する")
+    parser.add_argument("--rate", type=float, default=20.0, help="1 秒あたりのツール呼び出し数")
+    parser.add_argument("--duration", type=float, default=10.0, help="計測する秒数")
+    parser.add_argument("--warmup", type=float, default=0.0, help="計測前に同じ負荷をかける秒数")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"ツールの比率（既定: {DEFAULT_MIX}）")
+    parser.add_argument("--cities", type=int, default=200, help="使う都市の種類")
+    parser.add_argument("--zipf", type=float, default=1.1, help="都市の偏り（0 で一様）")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="同時に待つ呼び出しの上限")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="結果を JSON でも保存する")
+    mock = parser.add_argument_group("mock", "--mock を付けたときの mock_openmeteo.py の設定")
+    mock.add_argument("--mock", action="store_true", help="mock_openmeteo.py を起動して使う")
+    mock.add_argument("--mock-latency-ms", type=float, default=50.0)
+    mock.add_argument("--mock-jitter-ms", type=float, default=20.0)
+    mock.add_argument("--mock-error-rate", type=float, default=0.0)
+    mock.add_argument("--mock-not-found-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    proc = start_mock(args) if args.mock else None
+    try:
+        report = asyncio.run(main_async(args))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+import asyncio
+import bisect
+import os
+import time
+from typing import Callable, Iterable
+
+from fastmcp.server.middleware import CallNext, Middleware, MiddlewareContext
+
+# 秒単位のヒストグラムのバケット境界。p99 の SLO（数百 ms〜数秒）を切り分けられる刻みにする。
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# collector が返すサンプル: (メトリクス名, ラベル, 値)
+Sample = tuple[str, dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: tuple) -> tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} のラベルは {self.labelnames} です。")
+        return tuple(str(v) for v in labels)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def clear(self) -> None:
+        self._values.clear()
+
+    def render(self) -> list[str]:
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, key)} {_number(v)}" for key, v in sorted(self._values.items())
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value: float) -> None:
+        self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # ラベルの組ごとに [バケットごとの件数..., +Inf の件数], 合計
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = series
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def quantile(self, q: float, *labels) -> float | None:
+        """バケットから分位点を線形補間で推定する（Prometheus の histogram_quantile と同じ考え方）。"""
+        series = self._series.get(self._key(labels))
+        if series is None:
+            return None
+        counts = series[0]
+        n = sum(counts)
+        if not n:
+            return None
+        rank = q * n
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            if seen + count >= rank and count:
+                if bound == float("inf"):
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return lower
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for key, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total[0])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """メトリクスの入れ物。render() で Prometheus のテキスト形式に書き出す。
+
+    キャッシュの統計のように別の場所で数えている値は、collector として
+    関数を登録しておき、書き出すときに読み取る。
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: dict[str, tuple[dict[str, tuple[str, str]], Callable[[], Iterable[Sample]]]] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(
+        self,
+        name: str,
+        families: dict[str, tuple[str, str]],
+        collect: Callable[[], Iterable[Sample]],
+    ) -> None:
+        """families は {メトリクス名: (種類, 説明)}。collect() はその名前のサンプルを返す。"""
+        self._collectors[name] = (families, collect)
+
+    def remove_collector(self, name: str) -> None:
+        self._collectors.pop(name, None)
+
+    def get(self, name: str) -> _Metric | None:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for families, collect in self._collectors.values():
+            samples: dict[str, list[tuple[dict[str, str], float]]] = {name: [] for name in families}
+            for name, labels, value in collect():
+                samples[name].append((labels, value))
+            for name, (kind, help) in families.items():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples[name]:
+                    names = tuple(labels)
+                    lines.append(f"{name}{_labels(names, tuple(labels[n] for n in names))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class ToolMetricsMiddleware(Middleware):
+    """ツール呼び出しごとの所要時間・エラー数・実行中の数を数える。"""
+
+    def __init__(self, registry: Registry):
+        self.duration = registry.histogram(
+            "weather_tool_duration_seconds", "Tool call latency.", ("tool", "outcome")
+        )
+        self.errors = registry.counter("weather_tool_errors_total", "Tool calls that raised.", ("tool", "error"))
+        self.in_flight = registry.gauge("weather_tool_in_flight", "Tool calls currently running.", ("tool",))
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next: CallNext):
+        tool = context.message.name
+        self.in_flight.inc(tool)
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            return await call_next(context)
+        except Exception as e:
+            outcome = "error"
+            # FastMCP は ToolError で包むので、元の例外の型で数える
+            self.errors.inc(tool, type(e.__cause__ or e).__name__)
+            raise
+        finally:
+            self.duration.observe(time.perf_counter() - start, tool, outcome)
+            self.in_flight.dec(tool)
+
+
+def process_start_time() -> float:
+    """このプロセスが起動した時刻（time.time() 基準）。
+
+    launcher.py から起動されたときは、launcher が環境変数 WEATHER_LAUNCH_TIME で渡す時刻を使う。
+    それ以外は /proc からプロセスの開始時刻を読み、読めなければ今の時刻を返す。
+    """
+    launched = os.environ.get("WEATHER_LAUNCH_TIME")
+    if launched:
+        return float(launched)
+    try:
+        with open("/proc/self/stat") as f:
+            # 2 番目のフィールド（コマンド名）は空白を含みうるので ")" の後ろから数える。22 番目が開始時刻。
+            started = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return time.time()
+    return time.time() - uptime + started / os.sysconf("SC_CLK_TCK")
+
+
+class StartupMiddleware(Middleware):
+    """プロセスの起動から各段階までの秒数を weather_startup_seconds{phase} に記録する。
+
+    phase は imported（モジュールの読み込み完了）、ready（lifespan の準備完了）、
+    first_response（最初のツール呼び出しの応答）。各段階は最初の 1 回だけ記録する。
+    """
+
+    def __init__(self, registry: Registry, launched_at: float | None = None):
+        self.gauge = registry.gauge(
+            "weather_startup_seconds", "Seconds from process launch to each startup phase.", ("phase",)
+        )
+        self.reset(launched_at)
+
+    def reset(self, launched_at: float | None = None) -> None:
+        """起点を launched_at に取り直す。fork した子プロセスで、親の記録を消すのに使う。"""
+        self.launched_at = process_start_time() if launched_at is None else launched_at
+        self.phases: dict[str, float] = {}
+        self.gauge.clear()
+
+    def mark(self, phase: str) -> None:
+        if phase not in self.phases:
+            self.phases[phase] = time.time() - self.launched_at
+            self.gauge.set(phase, value=self.phases[phase])
+
+    def stats(self) -> dict:
+        return dict(self.phases)
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next: CallNext):
+        try:
+            return await call_next(context)
+        finally:
+            self.mark("first_response")
+
+
+async def serve(registry: Registry, host: str, port: int, span: int = 1) -> asyncio.Server:
+    """GET /metrics に Prometheus のテキスト形式で応答する最小限の HTTP サーバーを起動する。
+
+    port から span 個のポートを順に試し、最初に空いていたものを使う（複数ワーカーがそれぞれ
+    自分のレジストリを別のポートで公開するため）。すべて使用中なら最後の OSError を送出する。
+    """
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, body = "200 OK", registry.render().encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+    error: OSError | None = None
+    for candidate in range(port, port + max(span, 1)):
+        try:
+            return await asyncio.start_server(handle, host, candidate)
+        except OSError as e:
+            error = e
+    raise error
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""Open-Meteo のローカル代用サーバー（負荷試験用）
+
+/v1/search（ジオコーディング）、/v1/forecast（予報）、/v1/archive（過去の日別データ）を、
+本物と同じ形の JSON で返す。
+応答の遅延・エラー率・見つからない都市の割合を指定でき、ペイロードは
+要求された項目からその場で合成するか、JSON ファイルをひな形にする。
+
+Usage:
+    python mock_openmeteo.py --port 8765 --latency-ms 80 --jitter-ms 40 --error-rate 0.02
+    WEATHER_FORECAST_BASE=http://127.0.0.1:8765/v1 \\
+    WEATHER_GEOCODING_BASE=http://127.0.0.1:8765/v1 \\
+    WEATHER_ARCHIVE_BASE=http://127.0.0.1:8765/v1 python server.py
+"""
+
+import argparse
+import asyncio
+import copy
+import hashlib
+import json
+import math
+import random
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+@dataclass
+class MockConfig:
+    latency_ms: float = 50.0
+    jitter_ms: float = 20.0
+    error_rate: float = 0.0
+    not_found_rate: float = 0.0
+    forecast_template: dict | None = None
+    search_template: dict | None = None
+    counts: dict[str, int] = field(default_factory=dict)
+
+
+def _digest(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "big")
+
+
+def fake_location(name: str, not_found_rate: float) -> dict | None:
+    """都市名から決まった座標を作る。not_found_rate の割合の名前は「見つからない」扱いにする。"""
+    h = _digest(name.casefold())
+    if (h % 10_000) / 10_000 < not_found_rate:
+        return None
+    return {
+        "name": name,
+        "country": "Mockland",
+        "latitude": round((h >> 16) % 17_000 / 100 - 85, 4),
+        "longitude": round((h >> 32) % 36_000 / 100 - 180, 4),
+    }
+
+
+def _value(variable: str, seed: int, i: int) -> float:
+    if variable.startswith("weather_code"):
+        return (0, 1, 2, 3, 45, 61, 63, 80, 95)[(seed + i) % 9]
+    if "probability" in variable or "humidity" in variable:
+        return (seed + i * 7) % 100
+    if "direction" in variable:
+        return (seed + i * 13) % 360
+    if "precipitation" in variable or "rain" in variable:
+        return round(((seed + i) % 5) * 0.4, 1)
+    if "wind" in variable:
+        return round(5 + (seed + i) % 20 * 0.5, 1)
+    return round(15 + ((seed >> 3) + i) % 15 - 7 + (i % 24) * 0.1, 1)
+
+
+def _unit(variable: str) -> str:
+    if variable.startswith("weather_code"):
+        return "wmo code"
+    if "probability" in variable or "humidity" in variable:
+        return "%"
+    if "direction" in variable:
+        return "°"
+    if "precipitation" in variable or "rain" in variable:
+        return "mm"
+    if "wind" in variable:
+        return "km/h"
+    return "°C"
+
+
+def fake_forecast(latitude: float, longitude: float, query: dict, template: dict | None) -> dict:
+    """要求された current / hourly / daily の項目を持つ予報を合成する。"""
+    if template is not None:
+        data = copy.deepcopy(template)
+        data.update(latitude=latitude, longitude=longitude)
+        return data
+
+    seed = _digest(f"{latitude:.2f},{longitude:.2f}")
+    days = int(query.get("forecast_days", 7))
+    today = date.today()
+    data = {"latitude": latitude, "longitude": longitude, "timezone": "GMT", "utc_offset_seconds": 0}
+    if "current" in query:
+        variables = query["current"].split(",")
+        data["current"] = {"time": datetime.now().strftime("%Y-%m-%dT%H:00"), "interval": 900}
+        data["current"].update({v: _value(v, seed, 0) for v in variables})
+        data["current_units"] = {"time": "iso8601", **{v: _unit(v) for v in variables}}
+    if "hourly" in query:
+        variables = query["hourly"].split(",")
+        start = datetime.combine(today, datetime.min.time())
+        n = days * 24
+        data["hourly"] = {"time": [(start + timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M") for i in range(n)]}
+        data["hourly"].update({v: [_value(v, seed, i) for i in range(n)] for v in variables})
+        data["hourly_units"] = {"time": "iso8601", **{v: _unit(v) for v in variables}}
+    if "daily" in query:
+        variables = query["daily"].split(",")
+        data["daily"] = {"time": [(today + timedelta(days=i)).isoformat() for i in range(days)]}
+        data["daily"].update({v: [_value(v, seed, i) for i in range(days)] for v in variables})
+        data["daily_units"] = {"time": "iso8601", **{v: _unit(v) for v in variables}}
+    return data
+
+
+def fake_archive(latitude: float, longitude: float, query: dict) -> dict:
+    """start_date〜end_date の日別データを、季節変化と日ごとの揺らぎから合成する。"""
+    start = date.fromisoformat(query["start_date"])
+    end = date.fromisoformat(query["end_date"])
+    variables = query.get("daily", "").split(",")
+    seed = _digest(f"{latitude:.2f},{longitude:.2f}")
+    base = 25 - abs(latitude) * 0.4
+    # 南半球は季節が逆になる
+    swing = 10 if latitude >= 0 else -10
+
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    columns = {v: [] for v in variables}
+    for day in days:
+        noise = _digest(f"{seed}:{day.isoformat()}") % 1000 / 100 - 5
+        high = base + swing * math.cos(2 * math.pi * (day.timetuple().tm_yday - 200) / 365) + noise
+        for v in variables:
+            if v == "temperature_2m_min":
+                columns[v].append(round(high - 8 - noise / 2, 1))
+            elif "precipitation" in v:
+                columns[v].append(round(max(0.0, noise) * 2, 1))
+            else:
+                columns[v].append(round(high, 1))
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "timezone": "GMT",
+        "utc_offset_seconds": 0,
+        "daily": {"time": [day.isoformat() for day in days], **columns},
+        "daily_units": {"time": "iso8601", **{v: _unit(v) for v in variables}},
+    }
+
+
+def create_app(config: MockConfig) -> Starlette:
+    async def delay_or_fail(endpoint: str) -> JSONResponse | None:
+        config.counts[endpoint] = config.counts.get(endpoint, 0) + 1
+        latency = max(0.0, random.gauss(config.latency_ms, config.jitter_ms)) / 1000
+        if latency:
+            await asyncio.sleep(latency)
+        if random.random() < config.error_rate:
+            config.counts["errors"] = config.counts.get("errors", 0) + 1
+            return JSONResponse({"error": True, "reason": "mock failure"}, status_code=503)
+        return None
+
+    async def search(request: Request) -> JSONResponse:
+        if (failure := await delay_or_fail("search")) is not None:
+            return failure
+        name = request.query_params.get("name", "")
+        if config.search_template is not None:
+            return JSONResponse(config.search_template)
+        location = fake_location(name, config.not_found_rate)
+        if location is None:
+            return JSONResponse({"generationtime_ms": 0.1})
+        return JSONResponse({"results": [location], "generationtime_ms": 0.1})
+
+    async def forecast(request: Request) -> JSONResponse:
+        if (failure := await delay_or_fail("forecast")) is not None:
+            return failure
+        query = dict(request.query_params)
+        try:
+            latitudes = [float(v) for v in query["latitude"].split(",")]
+            longitudes = [float(v) for v in query["longitude"].split(",")]
+        except (KeyError, ValueError):
+            return JSONResponse({"error": True, "reason": "invalid coordinates"}, status_code=400)
+        data = [
+            fake_forecast(lat, lon, query, config.forecast_template)
+            for lat, lon in zip(latitudes, longitudes)
+        ]
+        # 本物と同じく、1 地点ならオブジェクト、複数地点ならリストで返す
+        return JSONResponse(data[0] if len(data) == 1 else data)
+
+    async def archive(request: Request) -> JSONResponse:
+        if (failure := await delay_or_fail("archive")) is not None:
+            return failure
+        query = dict(request.query_params)
+        try:
+            data = fake_archive(float(query["latitude"]), float(query["longitude"]), query)
+        except (KeyError, ValueError):
+            return JSONResponse({"error": True, "reason": "invalid parameters"}, status_code=400)
+        return JSONResponse(data)
+
+    async def stats(request: Request) -> JSONResponse:
+        return JSONResponse(config.counts)
+
+    return Starlette(routes=[
+        Route("/v1/search", search),
+        Route("/v1/forecast", forecast),
+        Route("/v1/archive", archive),
+        Route("/stats", stats),
+    ])
+
+
+def _load_json(path: str | None) -> dict | None:
+    if path is None:
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="平均応答遅延")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="遅延の標準偏差")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="503 を返す割合（0〜1）")
+    parser.add_argument("--not-found-rate", type=float, default=0.0, help="都市が見つからない割合（0〜1）")
+    parser.add_argument("--forecast-payload", help="/v1/forecast のひな形にする JSON ファイル")
+    parser.add_argument("--search-payload", help="/v1/search の応答にする JSON ファイル")
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        not_found_rate=args.not_found_rate,
+        forecast_template=_load_json(args.forecast_payload),
+        search_template=_load_json(args.search_payload),
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import re
+import time
+import unicodedata
+
+# 行政区分の接尾辞。「東京都」「大阪府」「大阪市」は「東京」「大阪」と同じ都市として扱う。
+_SUFFIXES = ("都", "府", "県", "市")
+# 接尾辞に見えても地名の一部なので外さないもの
+_KEEP_SUFFIX = {
+    "京都", "成都", "首都", "四日市", "廿日市", "八日市", "五日市",
+    "甲府", "防府", "国府", "大府", "太宰府", "大宰府",
+}
+
+_SPACES = re.compile(r"\s+")
+
+# 正規化後の表記ゆれ → 正規キー
+ALIASES = {
+    "ny": "new york",
+    "nyc": "new york",
+    "new york city": "new york",
+    "la": "los angeles",
+    "sf": "san francisco",
+    "washington dc": "washington d.c.",
+    "hk": "hong kong",
+    "kl": "kuala lumpur",
+    "saigon": "ho chi minh city",
+    "bombay": "mumbai",
+    "peking": "beijing",
+    "東京23区": "東京",
+    "東京都区部": "東京",
+}
+
+
+def _strip_latin_marks(text: str) -> str:
+    """ラテン文字のダイアクリティカルマークだけを外す（Tōkyō → Tokyo）。かなの濁点は残す。"""
+    out = []
+    for ch in unicodedata.normalize("NFD", text):
+        if unicodedata.combining(ch) and out and out[-1] < "ɐ":
+            continue
+        out.append(ch)
+    return unicodedata.normalize("NFC", "".join(out))
+
+
+def normalize_city(name: str, strip_suffix: bool = True) -> str:
+    """都市名を比較用のキーにする。
+
+    NFKC 正規化・大文字小文字の統一・空白の整理・ラテン文字の記号除去を行い、
+    strip_suffix なら末尾の「都・府・県・市」を 1 つだけ外す。
+    """
+    key = unicodedata.normalize("NFKC", name).casefold()
+    key = _SPACES.sub(" ", key).strip()
+    if key.isascii():
+        return key
+    key = _strip_latin_marks(key)
+    if strip_suffix and len(key) > 1 and key.endswith(_SUFFIXES) and key not in _KEEP_SUFFIX:
+        key = key[:-1]
+    return key
+
+
+class CityNormalizer:
+    """normalize_city に別名表を重ねて正規キーを返す。呼び出し回数と所要時間を数える。"""
+
+    def __init__(self, aliases: dict[str, str] | None = None):
+        self.aliases = {normalize_city(k): normalize_city(v) for k, v in ALIASES.items()}
+        if aliases:
+            self.aliases.update({normalize_city(k): normalize_city(v) for k, v in aliases.items()})
+        self.calls = 0
+        self.alias_hits = 0
+        self._elapsed_ns = 0
+
+    def __call__(self, name: str) -> str:
+        start = time.perf_counter_ns()
+        key = normalize_city(name)
+        canonical = self.aliases.get(key)
+        if canonical is not None:
+            self.alias_hits += 1
+            key = canonical
+        self._elapsed_ns += time.perf_counter_ns() - start
+        self.calls += 1
+        return key
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "alias_hits": self.alias_hits,
+            "aliases": len(self.aliases),
+            "avg_us": self._elapsed_ns / self.calls / 1000 if self.calls else 0.0,
+        }
@@ -0,0 +1,227 @@
+import asyncio
+import heapq
+import logging
+import time
+from pathlib import Path
+from typing import IO, Awaitable, Callable, Hashable
+
+from cache import StaleWhileRevalidateCache
+from forecaststore import ForecastStore
+from ratelimit import BATCH, priority
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# (地点のリスト, 項目) を受け取り、地点と同じ順で予報を返す関数
+FetchMany = Callable[[list[dict], dict], Awaitable[list[dict]]]
+
+
+def claim_leader(path: str | Path) -> IO | None:
+    """ロックファイルを排他的に取れたら、開いたファイルを返す（閉じるまで保持される）。
+
+    複数のワーカーのうち 1 つだけが先読みを動かすために使う。取れなければ None。
+    fcntl がない環境では常にリーダーになる。
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lock = open(path, "a")
+    if fcntl is None:
+        return lock
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return None
+    return lock
+
+
+class HotCities:
+    """予報キャッシュのキーごとの利用頻度を、半減期 halflife 秒で減衰させながら数える。
+
+    昔よく引かれた都市は時間とともに順位を下げ、いま引かれている都市が上に来る。
+    top() に出るのはスコアが min_score 以上のキーだけ。既定の 1.5 は「半減期以内に 2 回引かれた」に当たり、
+    1 回しか引かれていない都市を先読みし続けないようにする。次に引かれても min_score に届かないほど
+    スコアが下がったキー（min_score - 1 未満）は忘れる。
+    追跡するキーが max_tracked を超えたら、スコアの低いものから忘れる。
+
+    store があればヒットをそこにも書き、ranked() は全ワーカーの分を集めたスコアで上位を返す。
+    複数ワーカーでは先読みするのは 1 つだけなので、そのワーカーに届いた分だけでは順位が決まらないため。
+    """
+
+    def __init__(
+        self,
+        halflife: float = 3600.0,
+        max_tracked: int = 2000,
+        min_score: float = 1.5,
+        clock=time.monotonic,
+        store: ForecastStore | None = None,
+    ):
+        self.halflife = halflife
+        self.max_tracked = max_tracked
+        self.min_score = min_score
+        self.store = store
+        self._clock = clock
+        # key -> [スコア, スコアを計算した時刻, location, params, ttl]
+        self._entries: dict[Hashable, list] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _decayed(self, score: float, at: float, now: float) -> float:
+        return score * 0.5 ** ((now - at) / self.halflife)
+
+    def record(self, key: Hashable, location: dict, params: dict, ttl: float) -> None:
+        if self.store is not None:
+            self.store.record_hit(key, location, params, ttl)
+        now = self._clock()
+        entry = self._entries.get(key)
+        if entry is None:
+            self._entries[key] = [1.0, now, location, params, ttl]
+            if len(self._entries) > self.max_tracked:
+                self._forget(now)
+            return
+        entry[0] = self._decayed(entry[0], entry[1], now) + 1
+        entry[1] = now
+        entry[4] = min(entry[4], ttl)
+
+    def _forget(self, now: float) -> None:
+        keep = heapq.nlargest(
+            self.max_tracked * 3 // 4,
+            self._entries.items(),
+            key=lambda item: self._decayed(item[1][0], item[1][1], now),
+        )
+        self._entries = dict(keep)
+
+    def top(self, n: int) -> list[tuple[Hashable, dict, dict, float]]:
+        """スコアが min_score 以上のキーを、高い順に (key, location, params, ttl) で n 件返す。"""
+        now = self._clock()
+        scores = {key: self._decayed(entry[0], entry[1], now) for key, entry in self._entries.items()}
+        for key, score in scores.items():
+            if score < self.min_score - 1:
+                del self._entries[key]
+        best = heapq.nlargest(
+            n,
+            ((key, score) for key, score in scores.items() if score >= self.min_score),
+            key=lambda item: item[1],
+        )
+        return [(key, *self._entries[key][2:]) for key, _ in best]
+
+    async def ranked(self, n: int) -> list[tuple[Hashable, dict, dict, float]]:
+        """先読みの候補。store があれば全ワーカーの利用頻度で、なければこのプロセスの分で top(n) と同じ形で返す。"""
+        if self.store is not None:
+            return await self.store.hot(n, self.min_score)
+        return self.top(n)
+
+
+class Prefetcher:
+    """よく引かれる上位 top_n 件の予報を、キャッシュが新鮮でなくなる lead 秒前に取り直す。
+
+    interval 秒ごとに上位の都市を調べ、期限が近いものを項目ごとにまとめて
+    1 回の /forecast で取得する。リクエストは BATCH 優先度で送るので、
+    ツールからの問い合わせより後回しになる。store があれば取得した値を他のワーカーにも共有する。
+    """
+
+    def __init__(
+        self,
+        hot: HotCities,
+        cache: StaleWhileRevalidateCache,
+        fetch_many: FetchMany,
+        top_n: int = 20,
+        interval: float = 60.0,
+        lead: float = 120.0,
+        store: ForecastStore | None = None,
+    ):
+        self.hot = hot
+        self.cache = cache
+        self.store = store
+        self.fetch_many = fetch_many
+        self.top_n = top_n
+        self.interval = interval
+        self.lead = lead
+        self._task: asyncio.Task | None = None
+        self.runs = 0
+        self.refreshed = 0
+        self.errors = 0
+        self.last_run_ms = 0.0
+
+    def start(self) -> None:
+        if self._task is None and self.top_n > 0:
+            self._task = asyncio.create_task(self._loop())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception:
+                self.errors += 1
+                logger.exception("予報の先読みに失敗しました")
+
+    async def due(self) -> list[tuple[Hashable, dict, dict, float]]:
+        """上位の都市のうち、lead 秒以内に新鮮でなくなる（またはキャッシュにない）もの。"""
+        due = []
+        for key, location, params, ttl in await self.hot.ranked(self.top_n):
+            remaining = self.cache.fresh_for(key)
+            if remaining is None or remaining < self.lead:
+                due.append((key, location, params, ttl))
+        if self.store is not None and due:
+            # 他のワーカーが取得して共有ストアではまだ新鮮なものは、取り直さずにメモリに載せるだけにする
+            shared = await self.store.get_many([key for key, _, _, _ in due])
+            pending = []
+            for item in due:
+                found = shared.get(item[0])
+                if found is not None and found[1] >= self.lead:
+                    self.cache.set(item[0], found[0], found[1])
+                else:
+                    pending.append(item)
+            due = pending
+        return due
+
+    async def run_once(self) -> int:
+        start = time.perf_counter()
+        groups: dict[tuple, list[tuple[Hashable, dict, dict, float]]] = {}
+        for item in await self.due():
+            groups.setdefault(tuple(sorted(item[2].items())), []).append(item)
+
+        refreshed = 0
+        with priority(BATCH):
+            for items in groups.values():
+                try:
+                    forecasts = await self.fetch_many([location for _, location, _, _ in items], items[0][2])
+                except Exception:
+                    # 上流が不調なら次の周期に回す。キャッシュの古い値はそのまま使われる。
+                    self.errors += 1
+                    logger.warning("%d 地点の予報を先読みできませんでした", len(items), exc_info=True)
+                    continue
+                for (key, _, _, ttl), forecast in zip(items, forecasts):
+                    self.cache.set(key, forecast, ttl)
+                    if self.store is not None:
+                        self.store.put(key, forecast, ttl)
+                refreshed += len(items)
+
+        self.runs += 1
+        self.refreshed += refreshed
+        self.last_run_ms = (time.perf_counter() - start) * 1000
+        return refreshed
+
+    def stats(self) -> dict:
+        return {
+            "tracked": len(self.hot),
+            "top_n": self.top_n,
+            "interval": self.interval,
+            "lead": self.lead,
+            "runs": self.runs,
+            "refreshed": self.refreshed,
+            "errors": self.errors,
+            "last_run_ms": self.last_run_ms,
+        }
@@ -0,0 +1,150 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import httpx
+
+# 優先度。値が小さいほど先に通す。
+INTERACTIVE = 0
+BATCH = 1
+
+_priority: ContextVar[int] = ContextVar("upstream_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def priority(level: int):
+    """このブロック内（とそこから作ったタスク）の上流リクエストの優先度を変える。"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+class QueueFullError(httpx.TransportError):
+    """レート制限の待ち行列が満杯のため、上流へ送らずに失敗させた。"""
+
+
+class TokenBucket:
+    """1 秒あたり rate 個・最大 burst 個のトークンを配るバケット。
+
+    トークンがなければ優先度順の待ち行列（最大 max_queue 件）に並ぶ。
+    同じ優先度のあいだは到着順で、行列が満杯なら QueueFullError を送出する。
+    """
+
+    def __init__(self, rate: float, burst: int, max_queue: int, clock=time.monotonic):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate は正の数、burst は 1 以上を指定してください。")
+        self.rate = rate
+        self.burst = burst
+        self.max_queue = max_queue
+        self._clock = clock
+        self.tokens = float(burst)
+        self._updated = clock()
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+        self.acquired = 0
+        self.delayed = 0
+        self.rejected = 0
+        self.max_queued = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, level: int = INTERACTIVE, host: str = "") -> None:
+        self._refill()
+        if not self._waiters and self.tokens >= 1:
+            self.tokens -= 1
+            self.acquired += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(f"{host} へのリクエストが混み合っています。しばらくしてから再試行してください。")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (level, next(self._seq), future))
+        self.max_queued = max(self.max_queued, len(self._waiters))
+        self._schedule()
+        start = self._clock()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # トークンを受け取った直後にキャンセルされたら返しておく
+            if future.done() and not future.cancelled():
+                self.tokens += 1
+                self._schedule()
+            raise
+        waited = self._clock() - start
+        self.acquired += 1
+        self.delayed += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+
+    def _schedule(self) -> None:
+        if self._timer is not None or not self._waiters:
+            return
+        delay = max(0.0, (1 - self.tokens) / self.rate)
+        self._timer = asyncio.get_running_loop().call_later(delay, self._release)
+
+    def _release(self) -> None:
+        self._timer = None
+        self._refill()
+        while self._waiters and self.tokens >= 1:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.cancelled():
+                continue
+            self.tokens -= 1
+            future.set_result(None)
+        # キャンセル済みの待ちだけが残っていれば捨てる
+        while self._waiters and self._waiters[0][2].cancelled():
+            heapq.heappop(self._waiters)
+        self._schedule()
+
+    def stats(self) -> dict:
+        self._refill()
+        by_priority: dict[int, int] = {}
+        for level, _, future in self._waiters:
+            if not future.cancelled():
+                by_priority[level] = by_priority.get(level, 0) + 1
+        return {
+            "tokens": round(self.tokens, 2),
+            "queued": sum(by_priority.values()),
+            "queued_by_priority": by_priority,
+            "max_queued": self.max_queued,
+            "acquired": self.acquired,
+            "delayed": self.delayed,
+            "rejected": self.rejected,
+            "wait_ms_avg": self._wait_total / self.delayed * 1000 if self.delayed else 0.0,
+            "wait_ms_max": self._wait_max * 1000,
+        }
+
+
+class RateLimiter:
+    """ホストごとに TokenBucket を持つレート制限。"""
+
+    def __init__(self, rate: float, burst: int, max_queue: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_queue = max_queue
+        self._buckets: dict[str, TokenBucket] = {}
+
+    async def acquire(self, host: str) -> None:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.rate, self.burst, self.max_queue)
+        await bucket.acquire(current_priority(), host)
+
+    def stats(self) -> dict:
+        return {host: bucket.stats() for host, bucket in self._buckets.items()}
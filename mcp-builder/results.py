@@ -0,0 +1,210 @@
+from typing import Literal, NotRequired, TypedDict
+
+# ツールの出力形式。json のときは MCP の structured content で返し、文字列の整形を省く。
+OutputFormat = Literal["markdown", "json"]
+
+CURRENT_FIELDS = (
+    "temperature_2m",
+    "apparent_temperature",
+    "relative_humidity_2m",
+    "wind_speed_10m",
+    "wind_direction_10m",
+    "precipitation",
+)
+DAILY_FIELDS = (
+    "temperature_2m_max",
+    "temperature_2m_min",
+    "precipitation_sum",
+    "precipitation_probability_max",
+    "wind_speed_10m_max",
+)
+
+
+class Location(TypedDict):
+    name: str
+    country: str
+    latitude: float
+    longitude: float
+
+
+class CurrentWeather(TypedDict):
+    time: str
+    weather_code: int
+    weather: str
+    temperature_2m: float
+    apparent_temperature: float
+    relative_humidity_2m: float
+    wind_speed_10m: float
+    wind_direction_10m: float
+    precipitation: float
+    units: dict[str, str]
+    location: NotRequired[Location]
+
+
+class DailyForecast(TypedDict):
+    date: str
+    weather_code: int
+    weather: str
+    temperature_2m_max: float
+    temperature_2m_min: float
+    precipitation_sum: float
+    precipitation_probability_max: float
+    wind_speed_10m_max: float
+
+
+class WeeklyForecast(TypedDict):
+    location: NotRequired[Location]
+    days: list[DailyForecast]
+    units: dict[str, str]
+
+
+def _location(location: dict) -> Location:
+    return {key: location[key] for key in ("name", "country", "latitude", "longitude")}
+
+
+def current_result(data: dict, location: dict | None = None, describe=None) -> CurrentWeather:
+    """/forecast の current をそのまま型付きの dict にする。describe は WMO コード → 天気の説明。"""
+    current = data["current"]
+    result = {
+        "time": current.get("time", ""),
+        "weather_code": current["weather_code"],
+        "weather": describe(current["weather_code"]) if describe else "",
+        **{key: current[key] for key in CURRENT_FIELDS},
+        "units": {key: data["current_units"][key] for key in CURRENT_FIELDS},
+    }
+    if location is not None:
+        result["location"] = _location(location)
+    return result
+
+
+def daily_result(data: dict, location: dict | None = None, describe=None) -> WeeklyForecast:
+    """/forecast の daily（列ごとの配列）を日ごとの dict のリストにする。"""
+    daily = data["daily"]
+    codes = daily["weather_code"]
+    columns = [daily[key] for key in DAILY_FIELDS]
+    days = [
+        {
+            "date": date,
+            "weather_code": code,
+            "weather": describe(code) if describe else "",
+            **dict(zip(DAILY_FIELDS, values)),
+        }
+        for date, code, *values in zip(daily["time"], codes, *columns)
+    ]
+    result = {"days": days, "units": {key: data["daily_units"][key] for key in DAILY_FIELDS}}
+    if location is not None:
+        result["location"] = _location(location)
+    return result
+
+
+class HourlyWindow(TypedDict):
+    date: str
+    window: str
+    hours: int
+    temp_min: float | None
+    temp_max: float | None
+    precipitation: float | None
+    probability: float | None
+    wind_max: float | None
+    weather_code: int | None
+    weather: str
+
+
+class HourlyForecast(TypedDict):
+    location: Location
+    windows: list[HourlyWindow]
+    changes: list[dict]
+    units: dict[str, str]
+
+
+def hourly_result(
+    data: dict, location: dict, windows: list[dict], changes: list[dict], describe=None
+) -> HourlyForecast:
+    for row in windows:
+        code = row["weather_code"] = None if row["weather_code"] is None else int(row["weather_code"])
+        row["weather"] = describe(code) if describe and code is not None else ""
+    return {
+        "location": _location(location),
+        "windows": windows,
+        "changes": changes,
+        "units": {key: value for key, value in data["hourly_units"].items() if key != "time"},
+    }
+
+
+class ClimateValue(TypedDict):
+    value: float | None
+    normal: float | None
+    anomaly: float | None
+
+
+class ClimateDayValue(ClimateValue):
+    z: float | None
+
+
+class ClimateDay(TypedDict):
+    date: str
+    temperature_2m_max: ClimateDayValue
+    temperature_2m_min: ClimateDayValue
+    precipitation_sum: ClimateDayValue
+
+
+class ClimateSummary(TypedDict):
+    temperature_2m_max: ClimateValue
+    temperature_2m_min: ClimateValue
+    precipitation_sum: ClimateValue
+
+
+class ClimateComparison(TypedDict):
+    location: Location
+    first_year: int
+    last_year: int
+    days: list[ClimateDay]
+    summary: ClimateSummary
+    units: dict[str, str]
+
+
+def climate_result(
+    data: dict, location: dict, days: list[dict], summary: dict, period: tuple[int, int]
+) -> ClimateComparison:
+    """予報と平年値の比較。summary は気温が期間の平均、降水量が期間の合計。"""
+    return {
+        "location": _location(location),
+        "first_year": period[0],
+        "last_year": period[1],
+        "days": days,
+        "summary": summary,
+        "units": {key: data["daily_units"][key] for key in summary},
+    }
+
+
+class WeatherOverview(TypedDict):
+    location: Location
+    current: CurrentWeather
+    weekly: WeeklyForecast
+
+
+class CityError(TypedDict):
+    city: str
+    error: str
+
+
+class MultiCityWeather(TypedDict):
+    cities: list[CurrentWeather]
+    failures: list[CityError]
+
+
+def overview_result(data: dict, location: dict, describe=None) -> WeatherOverview:
+    return {
+        "location": _location(location),
+        "current": current_result(data, describe=describe),
+        "weekly": daily_result(data, describe=describe),
+    }
+
+
+def multi_result(
+    rows: list[tuple[dict, dict]], failures: list[tuple[str, Exception]], describe=None
+) -> MultiCityWeather:
+    return {
+        "cities": [current_result(data, location, describe) for location, data in rows],
+        "failures": [{"city": city, "error": str(err)} for city, err in failures],
+    }
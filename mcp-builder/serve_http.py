@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Weather MCP サーバーを streamable-HTTP で複数ワーカー起動する
+
+uvicorn が同じポートを共有する --workers 個のプロセスを立ち上げ、各プロセスが
+それぞれ lifespan（HTTP クライアント・キャッシュ）を持つ。ジオコーディングと予報の
+キャッシュは SQLite（WAL モード）のファイルで共有するので、あるワーカーが取得した結果を
+他のワーカーもすぐに使え、ワーカーごとにキャッシュを温め直す必要はない。
+
+セッションを持たない（stateless）HTTP で動かすので、ロードバランサーは
+どのワーカーに振り分けてもよい。SIGTERM / SIGINT を受けると新しい接続を止め、
+処理中のリクエストを --graceful-timeout 秒まで待ってから lifespan を閉じる
+（書き込みキューを流し、HTTP クライアントを閉じる）。
+
+メトリクスはワーカーごとに別々に集計される。--metrics-port を指定すると、各ワーカーが
+そのポートから --workers 個のうち空いているポートで自分の /metrics を公開するので、
+Prometheus ではそれらをすべてスクレイプして合算する。weather://metrics リソースも
+リクエストを処理したワーカー 1 つ分の値になる。
+
+Usage:
+    python serve_http.py --workers 4 --port 8000
+    python serve_http.py --workers 8 --host 0.0.0.0 --cache-dir /var/cache/weather-mcp
+    python serve_http.py --workers 4 --metrics-port 9100   # ワーカーごとに 9100〜9103
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "weather-mcp"
+
+
+def create_app():
+    """各ワーカーで呼ばれる ASGI アプリのファクトリ。"""
+    sys.path.insert(0, str(HERE))
+    from server import mcp
+
+    return mcp.http_app(path=os.environ.get("WEATHER_HTTP_PATH", "/mcp"), stateless_http=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--path", default="/mcp", help="MCP エンドポイントのパス")
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR, help="共有キャッシュの置き場所")
+    parser.add_argument("--metrics-port", type=int, help="ワーカーごとの /metrics を公開する最初のポート")
+    parser.add_argument("--graceful-timeout", type=float, default=30.0, help="終了時に処理中のリクエストを待つ秒数")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    # 設定はワーカーに環境変数で引き継ぐ（server.py は import 時に読む）
+    os.environ["WEATHER_HTTP_PATH"] = args.path
+    os.environ.setdefault("WEATHER_GEOCODE_DB", str(args.cache_dir / "geocode.sqlite3"))
+    os.environ.setdefault("WEATHER_FORECAST_DB", str(args.cache_dir / "forecast.sqlite3"))
+    os.environ.setdefault("WEATHER_ARCHIVE_DIR", str(args.cache_dir / "archive"))
+    if args.metrics_port:
+        os.environ["WEATHER_METRICS_PORT"] = str(args.metrics_port)
+    if os.environ.get("WEATHER_METRICS_PORT"):
+        # 全ワーカーが同じポートを取り合わないよう、ワーカーの数だけポートを割り当てる
+        os.environ["WEATHER_METRICS_PORT_SPAN"] = str(args.workers)
+    os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [str(HERE), os.environ.get("PYTHONPATH")]))
+    sys.path.insert(0, str(HERE))
+
+    uvicorn.run(
+        "serve_http:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        lifespan="on",
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level="info",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,549 @@
+import asyncio
+import json
+import os
 from contextlib import asynccontextmanager
+from datetime import date
+from pathlib import Path
+from typing import Any
 
 import httpx
 from fastmcp import FastMCP
 from fastmcp.server.context import Context
+from fastmcp.tools import ToolResult
 
-OPEN_METEO_BASE = "https://api.open-meteo.com/v1"
-GEOCODING_BASE = "https://geocoding-api.open-meteo.com/v1"
+from cache import NOT_FOUND, StaleWhileRevalidateCache, TTLCache
+from forecaststore import ForecastStore
+from gazetteer import Gazetteer
+from geostore import GeocodeStore
+from metrics import Registry, StartupMiddleware, ToolMetricsMiddleware, serve as serve_metrics
+from normalize import CityNormalizer
+from prefetch import HotCities, Prefetcher, claim_leader
+from ratelimit import BATCH, priority
+from results import (
+    OutputFormat,
+    climate_result,
+    current_result,
+    daily_result,
+    hourly_result,
+    multi_result,
+    overview_result,
+)
+from singleflight import SingleFlight
+from upstream import UpstreamConfig, build_client
+
+# 負荷試験では mock_openmeteo.py に向ける
+OPEN_METEO_BASE = os.environ.get("WEATHER_FORECAST_BASE", "https://api.open-meteo.com/v1")
+GEOCODING_BASE = os.environ.get("WEATHER_GEOCODING_BASE", "https://geocoding-api.open-meteo.com/v1")
+ARCHIVE_BASE = os.environ.get("WEATHER_ARCHIVE_BASE", "https://archive-api.open-meteo.com/v1")
+
+# 都市の座標はほぼ変わらないので長めに保持する。見つからなかった都市は短めに覚えておく。
+GEOCODE_CACHE_SIZE = 1024
+GEOCODE_CACHE_TTL = 7 * 24 * 3600
+GEOCODE_NEGATIVE_TTL = 10 * 60
+# 再起動後もジオコーディング結果を使い回すための SQLite ファイル
+GEOCODE_DB_PATH = Path(
+    os.environ.get("WEATHER_GEOCODE_DB", Path.home() / ".cache" / "weather-mcp" / "geocode.sqlite3")
+)
+
+# Open-Meteo の現在値は 15 分ごと、日別予報は 1 時間ごとに更新される
+FORECAST_TTL = {"current": 10 * 60, "daily": 60 * 60, "hourly": 60 * 60}
+# 期限切れ後この秒数までは古い値を即座に返し、裏で取り直す
+FORECAST_STALE_TTL = 60 * 60
+# 上流が不調で取り直せないときは、さらにこの秒数まで古い値で応答する
+FORECAST_ERROR_TTL = 6 * 60 * 60
+FORECAST_CACHE_SIZE = 512
+# 複数ワーカーで予報キャッシュを共有する SQLite ファイル。未設定なら各プロセスのメモリだけに持つ。
+FORECAST_DB_PATH = os.environ.get("WEATHER_FORECAST_DB")
+
+# よく引かれる上位 N 件の予報を、新鮮でなくなる LEAD 秒前に INTERVAL 秒ごとの巡回で取り直す。N=0 で無効。
+PREFETCH_TOP_N = int(os.environ.get("WEATHER_PREFETCH_TOP", "20"))
+PREFETCH_INTERVAL = float(os.environ.get("WEATHER_PREFETCH_INTERVAL", "60"))
+PREFETCH_LEAD = float(os.environ.get("WEATHER_PREFETCH_LEAD", "120"))
+# 利用頻度のスコアの半減期。共有ストアがあれば全ワーカーのヒットをそこで数える。
+PREFETCH_HALFLIFE = 3600.0
+# 複数ワーカーのうち、このロックを取れた 1 つだけが先読みする
+PREFETCH_LOCK_PATH = GEOCODE_DB_PATH.with_name("prefetch.lock")
+
+# 複数都市ツール: ジオコーディングの同時実行数と、1 回の /forecast にまとめる地点数
+MULTI_GEOCODE_CONCURRENCY = 8
+MULTI_FORECAST_BATCH = 50
+# 複数都市ツールが応答を返すまでの既定の上限秒数。過ぎたら取得できた都市だけで応答する。
+MULTI_DEADLINE = float(os.environ.get("WEATHER_MULTI_DEADLINE", "20"))
+# 上限秒数のこの割合を過ぎたら、解決の遅い都市を待たずに解決済みの都市の予報を取りに行く。
+# 残り時間のさらにこの割合を過ぎたら、その後に解決した都市をまとめてもう 1 回取りに行く。
+MULTI_GEOCODE_SHARE = 0.5
+
+# 平年値: 既定で直近 30 年（アーカイブは 1940 年から）。過去データは地点・年ごとにファイルで持つ。
+CLIMATE_YEARS = 30
+CLIMATE_MAX_YEARS = 50
+ARCHIVE_DIR = Path(os.environ.get("WEATHER_ARCHIVE_DIR", GEOCODE_DB_PATH.with_name("archive")))
+# アーカイブの再解析データは数日遅れでそろうので、年が明けてこの日数までは前年を平年値に使わない
+ARCHIVE_LAG_DAYS = 7
+# 計算した平年値をメモリに置いておく地点数と秒数
+CLIMATE_CACHE_SIZE = 256
+CLIMATE_CACHE_TTL = 24 * 60 * 60
+
+# Prometheus 形式のメトリクスを公開するポート。未設定なら MCP リソースだけで公開する。
+# 数値はプロセスごと。複数ワーカーでは各ワーカーが METRICS_PORT から METRICS_PORT_SPAN 個のうち
+# 空いているポートを 1 つ使うので、それぞれをスクレイプして合算する（serve_http.py が設定する）。
+METRICS_HOST = os.environ.get("WEATHER_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("WEATHER_METRICS_PORT", "0"))
+METRICS_PORT_SPAN = int(os.environ.get("WEATHER_METRICS_PORT_SPAN", "1"))
+
+CURRENT_PARAMS = {
+    "current": "temperature_2m,relative_humidity_2m,apparent_temperature,weather_code,wind_speed_10m,wind_direction_10m,precipitation",
+}
+DAILY_PARAMS = {
+    "daily": "weather_code,temperature_2m_max,temperature_2m_min,precipitation_sum,precipitation_probability_max,wind_speed_10m_max",
+    "forecast_days": 7,
+}
+HOURLY_VARIABLES = "temperature_2m,precipitation_probability,precipitation,weather_code,wind_speed_10m"
+HOURLY_MAX_DAYS = 7
+
+
+METRICS = Registry()
+# 起動から最初の応答までの時間。launcher.py から fork されたときは子プロセスで取り直す。
+STARTUP = StartupMiddleware(METRICS)
+
+CACHE_METRICS = {
+    "weather_cache_entries": ("gauge", "Entries currently held."),
+    "weather_cache_lookups_total": ("counter", "Cache lookups by result."),
+    "weather_cache_hit_ratio": ("gauge", "Hits divided by lookups since start."),
+    "weather_upstream_queue_depth": ("gauge", "Requests waiting for a rate-limit token."),
+    "weather_upstream_queue_wait_seconds_max": ("gauge", "Longest rate-limit wait since start."),
+    "weather_upstream_breaker_open": ("gauge", "1 while the circuit breaker is not closed."),
+    "weather_prefetch_refreshed_total": ("counter", "Forecasts refreshed ahead of expiry."),
+    "weather_prefetch_errors_total": ("counter", "Prefetch batches that failed."),
+}
+
+
+def collect_cache_metrics(state: dict):
+    """lifespan のキャッシュ類・上流クライアント・先読みの stats() をメトリクスのサンプルにする。"""
+    geocode = state["geocode_cache"].stats()
+    forecast = state["forecast_cache"].stats()
+    gazetteer = state["gazetteer"].stats()
+    for name, stats, results in (
+        ("geocode", geocode, ("hits", "negative_hits", "misses")),
+        ("forecast", forecast, ("fresh_hits", "stale_hits", "error_hits", "misses")),
+        ("gazetteer", {**gazetteer, "size": gazetteer["entries"]}, ("hits", "misses")),
+    ):
+        yield "weather_cache_entries", {"cache": name}, stats["size"]
+        for result in results:
+            yield "weather_cache_lookups_total", {"cache": name, "result": result}, stats[result]
+        lookups = sum(stats[r] for r in results if r != "error_hits")
+        hits = lookups - stats["misses"]
+        yield "weather_cache_hit_ratio", {"cache": name}, hits / lookups if lookups else 0.0
+    upstream = state["upstream"].stats()
+    for host, bucket in upstream["rate_limit"].items():
+        yield "weather_upstream_queue_depth", {"host": host}, bucket["queued"]
+        yield "weather_upstream_queue_wait_seconds_max", {"host": host}, bucket["wait_ms_max"] / 1000
+    for host, breaker in upstream["breakers"].items():
+        yield "weather_upstream_breaker_open", {"host": host}, int(breaker["state"] != "closed")
+    prefetch = state["prefetcher"].stats()
+    yield "weather_prefetch_refreshed_total", {}, prefetch["refreshed"]
+    yield "weather_prefetch_errors_total", {}, prefetch["errors"]
 
 
 @asynccontextmanager
 async def lifespan(mcp: FastMCP):
-    async with httpx.AsyncClient(timeout=30) as client:
-        yield {"http_client": client}
+    gazetteer = Gazetteer.load()
+    geocode_cache = TTLCache(
+        maxsize=GEOCODE_CACHE_SIZE,
+        ttl=GEOCODE_CACHE_TTL,
+        negative_ttl=GEOCODE_NEGATIVE_TTL,
+    )
+    geocode_store = GeocodeStore(GEOCODE_DB_PATH, ttl=GEOCODE_CACHE_TTL, negative_ttl=GEOCODE_NEGATIVE_TTL)
+    await geocode_store.open()
+    for key, value, ttl in await geocode_store.load_hot(GEOCODE_CACHE_SIZE):
+        geocode_cache.set(key, value, ttl=ttl)
+
+    forecast_cache = StaleWhileRevalidateCache(
+        maxsize=FORECAST_CACHE_SIZE,
+        stale_ttl=FORECAST_STALE_TTL,
+        error_ttl=FORECAST_ERROR_TTL,
+    )
+    forecast_store = ForecastStore(FORECAST_DB_PATH, halflife=PREFETCH_HALFLIFE) if FORECAST_DB_PATH else None
+    if forecast_store is not None:
+        await forecast_store.open()
 
+    client, transport = build_client(UpstreamConfig.from_env(), METRICS)
+    metrics_server = (
+        await serve_metrics(METRICS, METRICS_HOST, METRICS_PORT, METRICS_PORT_SPAN) if METRICS_PORT else None
+    )
+    hot_cities = HotCities(PREFETCH_HALFLIFE, store=forecast_store)
+    prefetcher = Prefetcher(
+        hot_cities,
+        forecast_cache,
+        lambda locations, params: _request_forecasts(client, locations, params),
+        top_n=PREFETCH_TOP_N,
+        interval=PREFETCH_INTERVAL,
+        lead=PREFETCH_LEAD,
+        store=forecast_store,
+    )
+    prefetch_lock = claim_leader(PREFETCH_LOCK_PATH) if PREFETCH_TOP_N else None
+    try:
+        async with client:
+            state = {
+                "http_client": client,
+                "upstream": transport,
+                "gazetteer": gazetteer,
+                "normalizer": CityNormalizer(),
+                "geocode_cache": geocode_cache,
+                "geocode_store": geocode_store,
+                "forecast_cache": forecast_cache,
+                "forecast_store": forecast_store,
+                "inflight": SingleFlight(),
+                "hot_cities": hot_cities,
+                "climate_cache": TTLCache(maxsize=CLIMATE_CACHE_SIZE, ttl=CLIMATE_CACHE_TTL),
+                # numpy を読み込むので、平年値のツールを初めて使うときに作る（climate_store() を参照）
+                "archive_store": None,
+                "prefetcher": prefetcher,
+                "metrics": METRICS,
+                # 応答の期限を過ぎても続けている取得（結果はキャッシュに残り、次の問い合わせで使われる）
+                "background": set(),
+            }
+            METRICS.add_collector("caches", CACHE_METRICS, lambda: collect_cache_metrics(state))
+            if prefetch_lock is not None:
+                prefetcher.start()
+            STARTUP.mark("ready")
+            try:
+                yield state
+            finally:
+                METRICS.remove_collector("caches")
+                for task in state["background"]:
+                    task.cancel()
+                await asyncio.gather(*state["background"], return_exceptions=True)
+                await prefetcher.close()
+                await forecast_cache.close()
+    finally:
+        if prefetch_lock is not None:
+            prefetch_lock.close()
+        if metrics_server is not None:
+            metrics_server.close()
+            await metrics_server.wait_closed()
+        if forecast_store is not None:
+            await forecast_store.close()
+        await geocode_store.close()
 
-mcp = FastMCP("Weather", lifespan=lifespan)
 
+mcp = FastMCP("Weather", lifespan=lifespan, middleware=[STARTUP, ToolMetricsMiddleware(METRICS)])
 
-async def geocode(client: httpx.AsyncClient, city: str) -> dict:
-    """都市名から緯度経度を取得する。"""
-    resp = await client.get(
-        f"{GEOCODING_BASE}/search",
-        params={"name": city, "count": 1, "language": "ja"},
-    )
-    resp.raise_for_status()
-    data = resp.json()
+
+def _not_found(city: str) -> ValueError:
+    return ValueError(f"'{city}' が見つかりませんでした。正しい都市名を指定してください。")
+
+
+async def geocode(
+    client: httpx.AsyncClient,
+    city: str,
+    cache: TTLCache | None = None,
+    store: GeocodeStore | None = None,
+    inflight: SingleFlight | None = None,
+    gazetteer: Gazetteer | None = None,
+    normalizer: CityNormalizer | None = None,
+) -> dict:
+    """都市名から緯度経度を取得する。
+
+    normalizer があれば「東京都」「Tokyo」「tokyo 」などの表記ゆれを 1 つのキーにまとめてから引く。
+    gazetteer に載っている都市はネットワークを使わずに解決する。
+    cache があれば結果（見つからなかった場合も含む）を再利用し、
+    store があれば新しい結果とヒットを永続化する。cache にないキーは store も引くので、
+    同じファイルを共有する別のワーカーが解決した都市は上流に問い合わせずに済む。
+    inflight があれば、同じ都市への同時リクエストを 1 本にまとめる。
+    """
+    key = normalizer(city) if normalizer is not None else city
+
+    if gazetteer is not None:
+        location = gazetteer.lookup_key(key) if normalizer is not None else gazetteer.lookup(city)
+        if location is not None:
+            return location
+
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None and store is not None:
+            store.touch(key)
+        if cached is NOT_FOUND:
+            raise _not_found(city)
+        if cached is not None:
+            return cached
+
+    if store is not None:
+        stored = await store.get(key)
+        if stored is not None:
+            value, remaining = stored
+            if cache is not None:
+                cache.set(key, value, ttl=remaining)
+            store.touch(key)
+            if value is NOT_FOUND:
+                raise _not_found(city)
+            return value
+
+    async def search() -> dict:
+        resp = await client.get(
+            f"{GEOCODING_BASE}/search",
+            params={"name": city, "count": 1, "language": "ja"},
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+    data = await inflight.do(("geocode", key), search) if inflight is not None else await search()
     if not data.get("results"):
-        raise ValueError(f"'{city}' が見つかりませんでした。正しい都市名を指定してください。")
+        if cache is not None:
+            cache.set(key, NOT_FOUND)
+        if store is not None:
+            store.put(key, NOT_FOUND)
+        raise _not_found(city)
     result = data["results"][0]
-    return {
+    location = {
         "name": result.get("name", city),
         "country": result.get("country", ""),
         "latitude": result["latitude"],
         "longitude": result["longitude"],
     }
+    if cache is not None:
+        cache.set(key, location)
+    if store is not None:
+        store.put(key, location)
+    return location
+
+
+async def resolve_city(state: dict, city: str) -> dict:
+    """lifespan で用意したキャッシュ類を使って geocode する。"""
+    return await geocode(
+        state["http_client"],
+        city,
+        cache=state["geocode_cache"],
+        store=state["geocode_store"],
+        inflight=state["inflight"],
+        gazetteer=state["gazetteer"],
+        normalizer=state["normalizer"],
+    )
+
+
+def forecast_key(latitude: float, longitude: float, params: dict) -> tuple:
+    """予報キャッシュのキー。座標は約 1km 単位に丸め、リクエストする項目で区別する。"""
+    return (round(latitude, 2), round(longitude, 2), tuple(sorted(params.items())))
+
+
+async def fetch_forecast(
+    client: httpx.AsyncClient,
+    location: dict,
+    params: dict,
+    cache: StaleWhileRevalidateCache | None = None,
+    ttl: float = 0,
+    inflight: SingleFlight | None = None,
+    hot: HotCities | None = None,
+    shared: ForecastStore | None = None,
+) -> dict:
+    """/forecast を呼び出して JSON を返す。
+
+    cache があれば ttl 秒のあいだ結果を再利用し、
+    inflight があれば同じ地点・項目への同時リクエストを 1 本にまとめる。
+    hot があれば利用頻度を記録し、先読みの対象にする。
+    shared があれば、cache に新鮮な値がないときに他のワーカーが取得した値を探し、
+    上流から取得した値はそこに書いて共有する。
+    """
+    query = {
+        "latitude": location["latitude"],
+        "longitude": location["longitude"],
+        **params,
+        "timezone": "auto",
+    }
+
+    key = forecast_key(location["latitude"], location["longitude"], params)
+    if hot is not None:
+        hot.record(key, location, params, ttl)
+
+    async def request() -> dict:
+        resp = await client.get(f"{OPEN_METEO_BASE}/forecast", params=query)
+        resp.raise_for_status()
+        data = resp.json()
+        if shared is not None:
+            shared.put(key, data, ttl)
+        return data
+
+    async def fetch() -> dict:
+        if inflight is None:
+            return await request()
+        return await inflight.do(("forecast", key), request)
+
+    if cache is None:
+        return await fetch()
+    if shared is not None and (cache.fresh_for(key) or 0) <= 0:
+        hit = await shared.get(key)
+        if hit is not None:
+            cache.set(key, *hit)
+    return await cache.get_or_fetch(key, fetch, ttl)
+
+
+async def _request_forecasts(client: httpx.AsyncClient, locations: list[dict], params: dict) -> list[dict]:
+    """複数地点の /forecast をカンマ区切りの座標でまとめて取得する。"""
+
+    async def request(chunk: list[dict]) -> list[dict]:
+        resp = await client.get(
+            f"{OPEN_METEO_BASE}/forecast",
+            params={
+                "latitude": ",".join(str(loc["latitude"]) for loc in chunk),
+                "longitude": ",".join(str(loc["longitude"]) for loc in chunk),
+                **params,
+                "timezone": "auto",
+            },
+        )
+        resp.raise_for_status()
+        data = resp.json()
+        # 1 地点だけのときはリストではなくオブジェクトが返る
+        return data if isinstance(data, list) else [data]
+
+    chunks = [locations[i:i + MULTI_FORECAST_BATCH] for i in range(0, len(locations), MULTI_FORECAST_BATCH)]
+    results = await asyncio.gather(*(request(chunk) for chunk in chunks))
+    return [data for chunk in results for data in chunk]
+
+
+async def fetch_forecasts(
+    client: httpx.AsyncClient,
+    locations: list[dict],
+    params: dict,
+    cache: StaleWhileRevalidateCache | None = None,
+    ttl: float = 0,
+    hot: HotCities | None = None,
+    shared: ForecastStore | None = None,
+) -> list[dict]:
+    """複数地点の予報を locations と同じ順で返す。
+
+    キャッシュにない地点だけを 1 回の /forecast でまとめて取得する。
+    古くなった地点も同じリクエストで取り直し、全地点がキャッシュにあるときは
+    古い値をそのまま返してバックグラウンドで更新する。
+    shared があれば、上流に問い合わせる前に他のワーカーが取得した値を探す。
+    """
+    keys = [forecast_key(loc["latitude"], loc["longitude"], params) for loc in locations]
+    if hot is not None:
+        for key, location in zip(keys, locations):
+            hot.record(key, location, params, ttl)
+    results: list[dict | None] = [None] * len(locations)
+    missing, stale = [], []
+    for i, key in enumerate(keys):
+        hit = cache.peek(key) if cache is not None else None
+        if hit is None:
+            missing.append(i)
+            continue
+        results[i], fresh = hit
+        if not fresh:
+            stale.append(i)
+
+    if shared is not None and (missing or stale):
+        found = await shared.get_many([keys[i] for i in missing + stale])
+        for i in missing + stale:
+            if keys[i] in found:
+                results[i], remaining = found[keys[i]]
+                if cache is not None:
+                    cache.set(keys[i], results[i], remaining)
+        missing = [i for i in missing if keys[i] not in found]
+        stale = [i for i in stale if keys[i] not in found]
+
+    async def refresh(indices: list[int]) -> list[dict]:
+        data = await _request_forecasts(client, [locations[i] for i in indices], params)
+        for i, forecast in zip(indices, data):
+            if cache is not None:
+                cache.set(keys[i], forecast, ttl)
+            if shared is not None:
+                shared.put(keys[i], forecast, ttl)
+        return data
+
+    if missing:
+        indices = missing + stale
+        try:
+            fetched = await refresh(indices)
+        except httpx.HTTPError:
+            # 上流が不調なら、期限切れでも残っている値で応答する。1 地点でもなければ諦める。
+            fallbacks = [cache.fallback(keys[i]) if cache is not None else None for i in missing]
+            if any(value is None for value in fallbacks):
+                raise
+            fetched = fallbacks + [results[i] for i in stale]
+        for i, forecast in zip(indices, fetched):
+            results[i] = forecast
+    elif stale:
+        cache.refresh_in_background(("batch", *(keys[i] for i in stale)), lambda: refresh(stale))
+    return results
+
+
+def climate_store(state: dict):
+    """過去データのファイルキャッシュ。numpy を読み込むので、初めて使うときに作る。"""
+    if state["archive_store"] is None:
+        from archivestore import ArchiveStore
+
+        state["archive_store"] = ArchiveStore(ARCHIVE_DIR)
+    return state["archive_store"]
+
+
+def climate_period(years: int, today: date | None = None) -> tuple[int, int]:
+    """平年値に使う年の範囲（両端を含む）。アーカイブに値がそろっている直近の年までを使う。"""
+    today = today or date.today()
+    last = today.year - 1 if today.timetuple().tm_yday > ARCHIVE_LAG_DAYS else today.year - 2
+    return last - years + 1, last
+
+
+async def fetch_archive(client: httpx.AsyncClient, location: dict, first: int, last: int) -> dict:
+    """archive API から first〜last 年の日別データを 1 回で取得する。"""
+    from climate import CLIMATE_VARIABLES
+
+    resp = await client.get(
+        f"{ARCHIVE_BASE}/archive",
+        params={
+            "latitude": location["latitude"],
+            "longitude": location["longitude"],
+            "start_date": f"{first}-01-01",
+            "end_date": f"{last}-12-31",
+            "daily": ",".join(CLIMATE_VARIABLES),
+            "timezone": "auto",
+        },
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def fetch_normals(client: httpx.AsyncClient, location: dict, years: int, state: dict) -> tuple[dict, tuple[int, int]]:
+    """地点の平年値と、その計算に使った年の範囲を返す。
+
+    計算済みの平年値はメモリに置く。なければ年ごとのファイルを読み、ない年だけを
+    連続する範囲ごとにまとめて archive API から取得してファイルに書く。
+    同じ地点・期間の同時リクエストは 1 本にまとめる。
+    """
+    import numpy as np
+
+    from climate import CALENDAR_DAYS, CLIMATE_VARIABLES, normals, split_years
+
+    first, last = climate_period(years)
+    latitude, longitude = round(location["latitude"], 2), round(location["longitude"], 2)
+    key = ("normals", latitude, longitude, first, last)
+    cache: TTLCache = state["climate_cache"]
+    if (hit := cache.get(key)) is not None:
+        return hit, (first, last)
+
+    async def compute() -> dict:
+        store = climate_store(state)
+        period = range(first, last + 1)
+        stored = await store.load(latitude, longitude, period)
+        missing = [year for year in period if year not in stored]
+        # 取得していない年を連続する範囲にまとめる（初回は 1 回のリクエストで全年を取る）
+        runs = []
+        for year in missing:
+            if runs and runs[-1][1] == year - 1:
+                runs[-1][1] = year
+            else:
+                runs.append([year, year])
+        for start, end in runs:
+            fetched = split_years((await fetch_archive(client, location, start, end))["daily"])
+            await store.save(latitude, longitude, fetched)
+            stored.update(fetched)
+
+        # 取得できなかった年（アーカイブにまだない年など）は欠測として平年値から除く
+        empty = dict.fromkeys(CLIMATE_VARIABLES, np.full(CALENDAR_DAYS, np.nan))
+        stack = {name: np.stack([stored.get(year, empty)[name] for year in period]) for name in CLIMATE_VARIABLES}
+        result = normals(stack)
+        cache.set(key, result)
+        return result
+
+    return await state["inflight"].do(key, compute), (first, last)
 
 
 WMO_CODES = {
@@ -53,33 +563,15 @@ def weather_description(code: int) -> str:
     return WMO_CODES.get(code, f"不明({code})")
 
 
-@mcp.tool
-async def get_current_weather(city: str, ctx: Context) -> str:
-    """指定した都市の現在の天気情報を取得します。
+def location_label(location: dict) -> str:
+    return f"{location['name']}（{location['country']}）"
 
-    Args:
-        city: 都市名（例: 東京、大阪、New York）
-    """
-    client: httpx.AsyncClient = ctx.lifespan_context["http_client"]
-
-    location = await geocode(client, city)
 
-    resp = await client.get(
-        f"{OPEN_METEO_BASE}/forecast",
-        params={
-            "latitude": location["latitude"],
-            "longitude": location["longitude"],
-            "current": "temperature_2m,relative_humidity_2m,apparent_temperature,weather_code,wind_speed_10m,wind_direction_10m,precipitation",
-            "timezone": "auto",
-        },
-    )
-    resp.raise_for_status()
-    data = resp.json()
+def render_current(data: dict) -> str:
+    """/forecast の current を箇条書きにする。"""
     current = data["current"]
     units = data["current_units"]
-
     return (
-        f"## {location['name']}（{location['country']}）の現在の天気\n\n"
         f"- 天気: {weather_description(current['weather_code'])}\n"
         f"- 気温: {current['temperature_2m']}{units['temperature_2m']}\n"
         f"- 体感温度: {current['apparent_temperature']}{units['apparent_temperature']}\n"
@@ -90,36 +582,33 @@ async def get_current_weather(city: str, ctx: Context) -> str:
     )
 
 
-@mcp.tool
-async def get_weekly_forecast(city: str, ctx: Context) -> str:
-    """指定した都市の週間天気予報（7日間）を取得します。
-
-    Args:
-        city: 都市名（例: 東京、大阪、New York）
-    """
-    client: httpx.AsyncClient = ctx.lifespan_context["http_client"]
+def render_current_table(rows: list[tuple[dict, dict]]) -> str:
+    """(location, /forecast の結果) の組を都市ごとの 1 行にした表にする。"""
+    lines = [
+        "| 都市 | 天気 | 気温 | 体感温度 | 湿度 | 風速 | 降水量 |",
+        "|------|------|------|----------|------|------|--------|",
+    ]
+    for location, data in rows:
+        current = data["current"]
+        units = data["current_units"]
+        lines.append(
+            f"| {location_label(location)} "
+            f"| {weather_description(current['weather_code'])} "
+            f"| {current['temperature_2m']}{units['temperature_2m']} "
+            f"| {current['apparent_temperature']}{units['apparent_temperature']} "
+            f"| {current['relative_humidity_2m']}{units['relative_humidity_2m']} "
+            f"| {current['wind_speed_10m']}{units['wind_speed_10m']} "
+            f"| {current['precipitation']}{units['precipitation']} |"
+        )
+    return "\n".join(lines)
 
-    location = await geocode(client, city)
 
-    resp = await client.get(
-        f"{OPEN_METEO_BASE}/forecast",
-        params={
-            "latitude": location["latitude"],
-            "longitude": location["longitude"],
-            "daily": "weather_code,temperature_2m_max,temperature_2m_min,precipitation_sum,precipitation_probability_max,wind_speed_10m_max",
-            "timezone": "auto",
-            "forecast_days": 7,
-        },
-    )
-    resp.raise_for_status()
-    data = resp.json()
+def render_daily(data: dict) -> str:
+    """/forecast の daily を日ごとの表にする。"""
     daily = data["daily"]
     units = data["daily_units"]
 
-    lines = [f"## {location['name']}（{location['country']}）の週間天気予報\n"]
-    lines.append(
-        f"| 日付 | 天気 | 最高気温 | 最低気温 | 降水確率 | 降水量 | 最大風速 |"
-    )
+    lines = ["| 日付 | 天気 | 最高気温 | 最低気温 | 降水確率 | 降水量 | 最大風速 |"]
     lines.append("|------|------|----------|----------|----------|--------|----------|")
 
     for i in range(len(daily["time"])):
@@ -136,5 +625,465 @@ async def get_weekly_forecast(city: str, ctx: Context) -> str:
     return "\n".join(lines)
 
 
+def _short_time(iso: str) -> str:
+    """'2026-10-19T14:00' → '10/19 14:00'"""
+    date, _, time = iso.partition("T")
+    _, month, day = date.split("-")
+    return f"{int(month)}/{int(day)} {time[:5]}"
+
+
+def _fmt(value: float | None, unit: str, digits: int = 1) -> str:
+    return "-" if value is None else f"{value:.{digits}f}{unit}"
+
+
+def render_hourly(data: dict, windows: list[dict], changes: list[dict]) -> str:
+    """時間帯ごとの集計を表にし、その後に注目すべき変化を並べる。"""
+    units = data["hourly_units"]
+    lines = ["| 日付 | 時間帯 | 天気 | 気温 | 降水確率 | 降水量 | 最大風速 |"]
+    lines.append("|------|--------|------|------|----------|--------|----------|")
+    for row in windows:
+        code = row["weather_code"]
+        lines.append(
+            f"| {row['date']} "
+            f"| {row['window']} "
+            f"| {'-' if code is None else weather_description(int(code))} "
+            f"| {_fmt(row['temp_min'], '')}〜{_fmt(row['temp_max'], units['temperature_2m'])} "
+            f"| {_fmt(row['probability'], units['precipitation_probability'], 0)} "
+            f"| {_fmt(row['precipitation'], units['precipitation'])} "
+            f"| {_fmt(row['wind_max'], units['wind_speed_10m'])} |"
+        )
+
+    if changes:
+        lines.append("\n### 注目すべき変化\n")
+        for change in changes:
+            when = _short_time(change["time"])
+            if change["kind"] == "rain_start":
+                code = change["weather_code"]
+                label = "雨" if code is None else weather_description(code)
+                lines.append(f"- {when} {label}が降り始める見込み")
+            elif change["kind"] == "rain_stop":
+                lines.append(f"- {when} 雨がやむ見込み")
+            else:
+                unit = units["temperature_2m"]
+                lines.append(
+                    f"- {when} 気温が {change['hours']} 時間で "
+                    f"{change['from']:.1f}{unit} → {change['to']:.1f}{unit} に下がる見込み"
+                )
+    return "\n".join(lines)
+
+
+def render_climate(data: dict, days: list[dict], summary: dict) -> str:
+    """日ごとの予報と平年差を表にし、期間全体のまとめを添える。"""
+    units = data["daily_units"]
+    temp_unit = units["temperature_2m_max"]
+    rain_unit = units["precipitation_sum"]
+
+    def diff(value: dict) -> str:
+        return "-" if value["anomaly"] is None else f"{value['anomaly']:+.1f}{temp_unit}"
+
+    lines = ["| 日付 | 最高気温 | 平年差 | 最低気温 | 平年差 | 降水量 | 平年 |"]
+    lines.append("|------|----------|--------|----------|--------|--------|------|")
+    for row in days:
+        high, low, rain = row["temperature_2m_max"], row["temperature_2m_min"], row["precipitation_sum"]
+        lines.append(
+            f"| {row['date']} "
+            f"| {_fmt(high['value'], temp_unit)} | {diff(high)} "
+            f"| {_fmt(low['value'], temp_unit)} | {diff(low)} "
+            f"| {_fmt(rain['value'], rain_unit)} | {_fmt(rain['normal'], rain_unit)} |"
+        )
+
+    lines.append(f"\n### {len(days)} 日間のまとめ\n")
+    for name, label in (("temperature_2m_max", "最高気温"), ("temperature_2m_min", "最低気温")):
+        value = summary[name]
+        lines.append(
+            f"- {label}: 平均 {_fmt(value['value'], temp_unit)}"
+            f"（平年 {_fmt(value['normal'], temp_unit)}、平年差 {diff(value)}）"
+        )
+    rain = summary["precipitation_sum"]
+    lines.append(f"- 降水量: 合計 {_fmt(rain['value'], rain_unit)}（平年 {_fmt(rain['normal'], rain_unit)}）")
+    return "\n".join(lines)
+
+
+@mcp.tool
+async def get_current_weather(city: str, ctx: Context, format: OutputFormat = "markdown") -> str | ToolResult:
+    """指定した都市の現在の天気情報を取得します。
+
+    Args:
+        city: 都市名（例: 東京、大阪、New York）
+        format: markdown（既定）か json。json なら整形せずに structured content で返します。
+    """
+    state = ctx.lifespan_context
+    client: httpx.AsyncClient = state["http_client"]
+
+    location = await resolve_city(state, city)
+
+    data = await fetch_forecast(
+        client,
+        location,
+        CURRENT_PARAMS,
+        state["forecast_cache"],
+        FORECAST_TTL["current"],
+        state["inflight"],
+        state["hot_cities"],
+        state["forecast_store"],
+    )
+
+    if format == "json":
+        return ToolResult(structured_content=current_result(data, location, weather_description))
+    return f"## {location_label(location)}の現在の天気\n\n" + render_current(data)
+
+
+@mcp.tool
+async def get_weekly_forecast(city: str, ctx: Context, format: OutputFormat = "markdown") -> str | ToolResult:
+    """指定した都市の週間天気予報（7日間）を取得します。
+
+    Args:
+        city: 都市名（例: 東京、大阪、New York）
+        format: markdown（既定）か json。json なら整形せずに structured content で返します。
+    """
+    state = ctx.lifespan_context
+    client: httpx.AsyncClient = state["http_client"]
+
+    location = await resolve_city(state, city)
+
+    data = await fetch_forecast(
+        client,
+        location,
+        DAILY_PARAMS,
+        state["forecast_cache"],
+        FORECAST_TTL["daily"],
+        state["inflight"],
+        state["hot_cities"],
+        state["forecast_store"],
+    )
+
+    if format == "json":
+        return ToolResult(structured_content=daily_result(data, location, weather_description))
+    return f"## {location_label(location)}の週間天気予報\n\n" + render_daily(data)
+
+
+@mcp.tool
+async def get_weather_overview(city: str, ctx: Context, format: OutputFormat = "markdown") -> str | ToolResult:
+    """指定した都市の現在の天気と週間天気予報（7日間）をまとめて取得します。
+
+    現在の天気と週間予報の両方が必要なときは、2 つのツールを呼ぶよりこちらを使ってください。
+
+    Args:
+        city: 都市名（例: 東京、大阪、New York）
+        format: markdown（既定）か json。json なら整形せずに structured content で返します。
+    """
+    state = ctx.lifespan_context
+    client: httpx.AsyncClient = state["http_client"]
+
+    location = await resolve_city(state, city)
+
+    # current と daily を 1 回のリクエストで取得する。短い方の TTL に合わせる。
+    data = await fetch_forecast(
+        client,
+        location,
+        {**CURRENT_PARAMS, **DAILY_PARAMS},
+        state["forecast_cache"],
+        min(FORECAST_TTL["current"], FORECAST_TTL["daily"]),
+        state["inflight"],
+        state["hot_cities"],
+        state["forecast_store"],
+    )
+
+    if format == "json":
+        return ToolResult(structured_content=overview_result(data, location, weather_description))
+    return (
+        f"## {location_label(location)}の天気\n\n"
+        f"### 現在の天気\n\n{render_current(data)}\n"
+        f"### 週間天気予報\n\n{render_daily(data)}"
+    )
+
+
+@mcp.tool
+async def get_hourly_forecast(
+    city: str, ctx: Context, days: int = 2, format: OutputFormat = "markdown"
+) -> str | ToolResult:
+    """指定した都市の時間ごとの予報を、時間帯（未明・朝・昼・夜）ごとにまとめて取得します。
+
+    雨の降り始め・降り止みや気温の急な低下も合わせて返します。
+
+    Args:
+        city: 都市名（例: 東京、大阪、New York）
+        days: 何日先までか（1〜7、既定は 2）
+        format: markdown（既定）か json。json なら整形せずに structured content で返します。
+    """
+    if not 1 <= days <= HOURLY_MAX_DAYS:
+        raise ValueError(f"days は 1〜{HOURLY_MAX_DAYS} の範囲で指定してください。")
+
+    state = ctx.lifespan_context
+    client: httpx.AsyncClient = state["http_client"]
+
+    location = await resolve_city(state, city)
+
+    data = await fetch_forecast(
+        client,
+        location,
+        {"hourly": HOURLY_VARIABLES, "forecast_days": days},
+        state["forecast_cache"],
+        FORECAST_TTL["hourly"],
+        state["inflight"],
+        state["hot_cities"],
+        state["forecast_store"],
+    )
+
+    # numpy の読み込みは重い（起動時間の 1 割近く）ので、時間帯別の予報を初めて使うときまで遅らせる
+    from hourly import aggregate_windows, detect_changes
+
+    windows = aggregate_windows(data)
+    changes = detect_changes(data)
+    if format == "json":
+        return ToolResult(structured_content=hourly_result(data, location, windows, changes, weather_description))
+    return f"## {location_label(location)}の時間帯別の天気\n\n" + render_hourly(data, windows, changes)
+
+
+@mcp.tool
+async def get_climate_comparison(
+    city: str, ctx: Context, years: int = CLIMATE_YEARS, format: OutputFormat = "markdown"
+) -> str | ToolResult:
+    """指定した都市の週間天気予報（7日間）を平年値と比べます。
+
+    「今週は平年と比べてどうか」に答えるためのツールです。平年値は過去 years 年の同じ時期の
+    日別データ（Open-Meteo の過去データ）から求め、日ごとの予報との差と、7 日間のまとめを返します。
+    同じ都市の過去データは一度取得したら手元に残るので、2 回目以降は予報の取得だけで済みます。
+
+    Args:
+        city: 都市名（例: 東京、大阪、New York）
+        years: 平年値に使う年数（1〜50、既定は 30）
+        format: markdown（既定）か json。json なら整形せずに structured content で返します。
+    """
+    if not 1 <= years <= CLIMATE_MAX_YEARS:
+        raise ValueError(f"years は 1〜{CLIMATE_MAX_YEARS} の範囲で指定してください。")
+
+    state = ctx.lifespan_context
+    client: httpx.AsyncClient = state["http_client"]
+
+    location = await resolve_city(state, city)
+
+    data, (normal, period) = await asyncio.gather(
+        fetch_forecast(
+            client,
+            location,
+            DAILY_PARAMS,
+            state["forecast_cache"],
+            FORECAST_TTL["daily"],
+            state["inflight"],
+            state["hot_cities"],
+            state["forecast_store"],
+        ),
+        fetch_normals(client, location, years, state),
+    )
+
+    from climate import compare
+
+    days, summary = compare(data["daily"], normal)
+    if format == "json":
+        return ToolResult(structured_content=climate_result(data, location, days, summary, period))
+    return (
+        f"## {location_label(location)}の週間予報と平年値（{period[0]}〜{period[1]} 年）\n\n"
+        + render_climate(data, days, summary)
+    )
+
+
+@mcp.tool
+async def get_current_weather_multi(
+    cities: list[str],
+    ctx: Context,
+    format: OutputFormat = "markdown",
+    deadline: float = MULTI_DEADLINE,
+) -> str | ToolResult:
+    """複数の都市の現在の天気をまとめて取得し、1 つの表で返します。
+
+    都市を解決するたび・予報が届くたびに進捗を通知し、届いた都市の天気を先にログで流します。
+    deadline 秒を過ぎたら、それまでに取得できた都市だけで応答します。
+
+    Args:
+        cities: 都市名のリスト（例: ["東京", "大阪", "New York"]）
+        format: markdown（既定）か json。json なら整形せずに structured content で返します。
+        deadline: 応答までの上限秒数。0 以下なら全都市を待ちます。
+    """
+    names = list(dict.fromkeys(cities))
+    if not names:
+        raise ValueError("都市名を 1 つ以上指定してください。")
+
+    # 一度に多くのリクエストを出すので、単一都市の問い合わせを先に通す
+    with priority(BATCH):
+        rows, failures = await _current_weather_multi(
+            names, ctx.lifespan_context, ctx, deadline if deadline > 0 else None
+        )
+
+    if format == "json":
+        return ToolResult(structured_content=multi_result(rows, failures, weather_description))
+
+    lines = ["## 複数都市の現在の天気\n"]
+    if rows:
+        lines.append(render_current_table(rows))
+
+    if failures:
+        lines.append("\n取得できなかった都市:")
+        lines.extend(f"- {city}: {err}" for city, err in failures)
+
+    return "\n".join(lines)
+
+
+async def _current_weather_multi(
+    names: list[str], state: dict, ctx: Context | None = None, deadline: float | None = None
+) -> tuple[list[tuple[dict, dict]], list[tuple[str, Exception]]]:
+    """都市名を解決して現在の天気を取得し、(location, /forecast の結果) の組と失敗した都市を返す。
+
+    解決できた都市は MULTI_FORECAST_BATCH 地点ずつまとめて予報を取得し、届いたまとまりから
+    ctx.info で流す。進捗は都市の解決と予報の取得をそれぞれ 1 件と数える。
+    deadline があれば、その MULTI_GEOCODE_SHARE の割合を過ぎた時点で解決済みの都市の予報を
+    取りに行く。遅れて解決した都市は 1 件ずつではなく、全都市の解決が終わったとき・まとまりが
+    いっぱいになったとき・残り時間の MULTI_GEOCODE_SHARE を過ぎたときにまとめて取る。
+    deadline を過ぎても終わっていない都市は失敗として返す。その取得は打ち切らずにバックグラウンドで
+    続け（state["background"]）、結果はキャッシュに残す。
+    """
+    client: httpx.AsyncClient = state["http_client"]
+    loop = asyncio.get_running_loop()
+    until = None
+    # 解決待ちの都市が残っていても、解決済みの都市の予報をまとめて取りに行く時刻
+    flushes: list[float] = []
+    if deadline is not None:
+        until = loop.time() + deadline
+        cutoff = loop.time() + deadline * MULTI_GEOCODE_SHARE
+        flushes = [cutoff, cutoff + (until - cutoff) * MULTI_GEOCODE_SHARE]
+    total = len(names) * 2
+    done = 0
+
+    async def advance(count: int, message: str) -> None:
+        nonlocal done
+        done += count
+        if ctx is not None:
+            await ctx.report_progress(done, total, message)
+
+    semaphore = asyncio.Semaphore(MULTI_GEOCODE_CONCURRENCY)
+
+    async def resolve(city: str) -> dict | Exception:
+        async with semaphore:
+            try:
+                return await resolve_city(state, city)
+            except (ValueError, httpx.HTTPError) as e:
+                return e
+
+    async def fetch_chunk(chunk: list[str]) -> list[dict] | Exception:
+        try:
+            return await fetch_forecasts(
+                client,
+                [resolved[city] for city in chunk],
+                CURRENT_PARAMS,
+                state["forecast_cache"],
+                FORECAST_TTL["current"],
+                state["hot_cities"],
+                state["forecast_store"],
+            )
+        except httpx.HTTPError as e:
+            return e
+
+    resolved: dict[str, dict | Exception] = {}
+    forecasts: dict[str, dict | Exception] = {}
+    ready: list[str] = []
+    geocoding = len(names)
+    # タスク -> (True なら都市の解決、False なら予報の取得, 都市名または都市名のリスト)
+    tasks: dict[asyncio.Task, tuple[bool, Any]] = {
+        asyncio.create_task(resolve(city)): (True, city) for city in names
+    }
+
+    while tasks:
+        wake = until
+        if ready and geocoding and flushes:
+            wake = min(until, flushes[0])
+        timeout = None if wake is None else max(wake - loop.time(), 0)
+        finished, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+        for task in finished:
+            is_resolve, arg = tasks.pop(task)
+            result = task.result()
+            if is_resolve:
+                geocoding -= 1
+                resolved[arg] = result
+                if isinstance(result, Exception):
+                    # 予報の分もまとめて進める
+                    await advance(2, f"{arg}: 解決できませんでした")
+                else:
+                    ready.append(arg)
+                    await advance(1, f"{arg} → {location_label(result)}")
+            elif isinstance(result, Exception):
+                forecasts.update(dict.fromkeys(arg, result))
+                await advance(len(arg), f"{len(arg)} 都市の予報を取得できませんでした")
+            else:
+                forecasts.update(zip(arg, result))
+                await advance(len(arg), f"{len(arg)} 都市の予報を取得しました")
+                if ctx is not None:
+                    await ctx.info(render_current_table([(resolved[city], forecasts[city]) for city in arg]))
+
+        flush = bool(flushes) and loop.time() >= flushes[0]
+        while flushes and loop.time() >= flushes[0]:
+            flushes.pop(0)
+        if ready and (not geocoding or flush or len(ready) >= MULTI_FORECAST_BATCH):
+            for i in range(0, len(ready), MULTI_FORECAST_BATCH):
+                chunk = ready[i:i + MULTI_FORECAST_BATCH]
+                tasks[asyncio.create_task(fetch_chunk(chunk))] = (False, chunk)
+            ready = []
+
+        if until is not None and loop.time() >= until:
+            break
+
+    if tasks:
+        # 打ち切ると上流へのリクエストが途中で捨てられるだけなので、終わるまで続けてキャッシュを温める
+        background: set[asyncio.Task] = state["background"]
+        for task in tasks:
+            background.add(task)
+            task.add_done_callback(background.discard)
+        await advance(total - done, "時間内に終わらなかった都市は、取得をバックグラウンドで続けます")
+
+    rows, failures = [], []
+    late = TimeoutError(f"{deadline or 0:g} 秒以内に取得できませんでした")
+    for city in names:
+        location = resolved.get(city, late)
+        data = forecasts.get(city, late) if isinstance(location, dict) else location
+        if isinstance(data, Exception):
+            failures.append((city, data))
+        else:
+            rows.append((location, data))
+    return rows, failures
+
+
+@mcp.resource("weather://stats/cache", mime_type="application/json")
+async def cache_stats(ctx: Context) -> str:
+    """ジオコーディング・予報・平年値のキャッシュ、都市名正規化、上流クライアント、先読み、起動時間の統計。"""
+    state = ctx.lifespan_context
+    return json.dumps(
+        {
+            "normalizer": state["normalizer"].stats(),
+            "gazetteer": state["gazetteer"].stats(),
+            "geocode_cache": state["geocode_cache"].stats(),
+            "forecast_cache": state["forecast_cache"].stats(),
+            "inflight": state["inflight"].stats(),
+            "upstream": state["upstream"].stats(),
+            "prefetch": state["prefetcher"].stats(),
+            "forecast_store": state["forecast_store"].stats() if state["forecast_store"] is not None else None,
+            "climate_cache": state["climate_cache"].stats(),
+            "archive_store": state["archive_store"].stats() if state["archive_store"] is not None else None,
+            "startup": STARTUP.stats(),
+        },
+        ensure_ascii=False,
+    )
+
+
+@mcp.resource("weather://metrics", mime_type="text/plain")
+async def prometheus_metrics(ctx: Context) -> str:
+    """ツール・上流 API のレイテンシとエラー数、キャッシュのヒット率（Prometheus のテキスト形式）。
+
+    値はこのリクエストを処理したプロセスのもの。複数ワーカーで全体を見るには各ワーカーの /metrics を合算する。
+    """
+    return ctx.lifespan_context["metrics"].render()
+
+
+STARTUP.mark("imported")
+
 if __name__ == "__main__":
     mcp.run()
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from pathlib import Path
+
+# 書き込みキューが溢れた場合は書き込みを捨てる（メモリキャッシュには入っているため）
+_QUEUE_SIZE = 10_000
+_BATCH_SIZE = 500
+# close() でキューに残った書き込みを待つ上限（秒）
+_CLOSE_TIMEOUT = 30.0
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindStore:
+    """SQLite（WAL モード）に書き込みをまとめて流すストアの土台。
+
+    書き込みはキューに積み、バックグラウンドのタスクがまとめて 1 トランザクションで書く。
+    書き込みに失敗したまとまりはログに残して捨て、タスクは止めない。読み出しの失敗はキャッシュミスとして扱う。
+    読み出しは書き込み用とは別の接続でスレッドに逃がすので、イベントループを止めない。
+    WAL なので、同じファイルを開いている別プロセスの書き込み中も読み出せる。
+
+    サブクラスは SCHEMA（複数の文を書ける）・_write_batch・_compact を定義する。
+    """
+
+    SCHEMA = ""
+
+    def __init__(self, path: str | Path, compact_interval: float = 3600.0):
+        self.path = Path(path)
+        self.compact_interval = compact_interval
+        self._conn: sqlite3.Connection | None = None
+        self._reader: sqlite3.Connection | None = None
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=_QUEUE_SIZE)
+        self._writer: asyncio.Task | None = None
+        self._stopping = asyncio.Event()
+        self.dropped_writes = 0
+        self.failed_writes = 0
+        self.read_errors = 0
+
+    async def open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = await asyncio.to_thread(self._connect)
+        self._reader = await asyncio.to_thread(self._connect)
+        await asyncio.to_thread(self._compact)
+        self._writer = asyncio.create_task(self._write_loop())
+
+    async def close(self) -> None:
+        """キューに残っている書き込みを流してから閉じる。"""
+        finished = True
+        if self._writer is not None:
+            self._stopping.set()
+            # キューが満杯ならタスクは get() で待っていないので、起こさなくても残りを流して終わる
+            try:
+                self._queue.put_nowait(None)
+            except asyncio.QueueFull:
+                pass
+            try:
+                await asyncio.wait_for(self._writer, _CLOSE_TIMEOUT)
+            except asyncio.TimeoutError:
+                finished = False
+                logger.warning("%s: %d 件の書き込みを残したまま閉じます", self.path, self._queue.qsize())
+            self._writer = None
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        if self._conn is not None:
+            # 打ち切った書き込みがスレッドで続いているかもしれないので、その接続には触らない
+            if finished:
+                try:
+                    await asyncio.to_thread(self._compact)
+                except sqlite3.Error:
+                    logger.exception("%s の整理に失敗しました", self.path)
+                self._conn.close()
+            self._conn = None
+
+    async def _read(self, fn, *args, default=None):
+        """読み出しをスレッドで行う。SQLite のエラー（ロック待ちの打ち切り・破損など）はログに残し、
+        default を返してキャッシュミスとして扱う（呼び出し側は上流に問い合わせる）。"""
+        try:
+            return await asyncio.to_thread(fn, *args)
+        except sqlite3.Error:
+            self.read_errors += 1
+            logger.warning("%s を読めませんでした", self.path, exc_info=True)
+            return default
+
+    def _enqueue(self, item: tuple) -> None:
+        if self._writer is None:
+            return
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.dropped_writes += 1
+
+    async def _write_loop(self) -> None:
+        last_compact = time.monotonic()
+        while True:
+            item = await self._queue.get()
+            batch = [item]
+            while len(batch) < _BATCH_SIZE and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            batch = [b for b in batch if b is not None]
+            if batch:
+                try:
+                    await asyncio.to_thread(self._write_batch, batch)
+                except Exception:
+                    # ロック待ちの打ち切り・ディスク不足・不正な行など。メモリキャッシュには入っているので捨てて続ける
+                    self.failed_writes += len(batch)
+                    logger.exception("%s: %d 件の書き込みに失敗しました", self.path, len(batch))
+            if time.monotonic() - last_compact > self.compact_interval:
+                try:
+                    await asyncio.to_thread(self._compact)
+                except Exception:
+                    logger.exception("%s の整理に失敗しました", self.path)
+                last_compact = time.monotonic()
+            if self._stopping.is_set() and self._queue.empty():
+                return
+
+    def _connect(self) -> sqlite3.Connection:
+        # 複数のワーカープロセスが同じファイルに書くので、ロック待ちは長めに取る
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(self.SCHEMA)
+        conn.commit()
+        return conn
+
+    def _write_batch(self, batch: list[tuple]) -> None:
+        raise NotImplementedError
+
+    def _compact(self) -> None:
+        raise NotImplementedError
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Weather MCP サーバーの起動時間の計測
+
+1. python -X importtime で server.py の読み込みにかかる時間を、server.py が直接読み込むモジュールごとに集計する。
+2. stdio でサーバーを起動してから最初のツール呼び出しが返るまでの時間（コールドスタート）を、
+   server.py を直接起動した場合と launcher.py の zygote から fork した場合とで --runs 回ずつ測る。
+
+ツール呼び出しは mock_openmeteo.py に向けるので、本物の API には一切アクセスしない。
+
+Usage:
+    python startup_bench.py
+    python startup_bench.py --runs 20 --json startup.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from loadgen import start_mock
+
+HERE = Path(__file__).resolve().parent
+
+
+def import_profile(top: int) -> tuple[float, list[tuple[str, float]]]:
+    """server.py の読み込み時間（ms）と、server.py が直接読み込むモジュールのうち重い上位 top 件を返す。
+
+    ほかのモジュールと共有する依存は、最初に読み込んだモジュールの時間に含まれる。
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=HERE,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0.0
+    modules: list[tuple[str, float]] = []
+    # "import time: self [us] | cumulative | imported package"。名前の字下げ 2 つが 1 段の入れ子。
+    for line in proc.stderr.splitlines()[1:]:
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0 and name.strip() == "server":
+            total = int(cumulative) / 1000
+        elif depth == 1:
+            modules.append((name.strip(), int(cumulative) / 1000))
+    modules.sort(key=lambda item: item[1], reverse=True)
+    return total, modules[:top]
+
+
+async def first_response(command: list[str], cache_dir: str) -> float:
+    """command でサーバーを起動してから、最初のツール呼び出しが返るまでの秒数。
+
+    cache_dir（サーバーの SQLite キャッシュと過去データの置き場所）は毎回空にしてから起動する。
+    """
+    from fastmcp import Client
+    from fastmcp.client.transports import StdioTransport
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.makedirs(cache_dir)
+    start = time.perf_counter()
+    transport = StdioTransport(command[0], command[1:], env=dict(os.environ), cwd=str(HERE))
+    async with Client(transport) as client:
+        await client.call_tool("get_current_weather", {"city": "東京"})
+        elapsed = time.perf_counter() - start
+    return elapsed
+
+
+def summarize(samples: list[float]) -> dict:
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        "runs": len(ms),
+        "p50_ms": statistics.median(ms),
+        "min_ms": ms[0],
+        "max_ms": ms[-1],
+    }
+
+
+async def cold_starts(runs: int, cache_dir: str) -> dict:
+    socket_path = os.path.join(tempfile.mkdtemp(prefix="weather-launcher-"), "zygote.sock")
+    zygote = subprocess.Popen(
+        [sys.executable, str(HERE / "launcher.py"), "zygote", "--socket", socket_path],
+        cwd=HERE,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while not os.path.exists(socket_path):
+            if time.monotonic() > deadline or zygote.poll() is not None:
+                raise SystemExit("launcher.py zygote が起動しませんでした。")
+            await asyncio.sleep(0.05)
+
+        commands = {
+            "direct": [sys.executable, str(HERE / "server.py")],
+            "launcher": [sys.executable, str(HERE / "launcher.py"), "connect", "--socket", socket_path],
+        }
+        results = {}
+        for name, command in commands.items():
+            samples = [await first_response(command, cache_dir) for _ in range(runs)]
+            results[name] = summarize(samples)
+        return results
+    finally:
+        zygote.terminate()
+        zygote.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="起動方法ごとの計測回数")
+    parser.add_argument("--top", type=int, default=10, help="表示する重いモジュールの数")
+    parser.add_argument("--json", type=Path, help="結果を JSON で書き出すファイル")
+    args = parser.parse_args()
+
+    total, modules = import_profile(args.top)
+    print(f"## server.py の読み込み: {total:.0f} ms\n")
+    print("| モジュール | ms |")
+    print("|------------|----|")
+    for name, ms in modules:
+        print(f"| {name} | {ms:.0f} |")
+
+    mock = start_mock(argparse.Namespace(
+        mock_latency_ms=0, mock_jitter_ms=0, mock_error_rate=0, mock_not_found_rate=0,
+    ))
+    # キャッシュのファイルを一時ディレクトリに向け、計測のたびに空にする（どの回も冷えたキャッシュから始まる）。
+    # zygote は server.py を読み込んだ時点のパスを使うので、ディレクトリは変えずに中身を消す。
+    cache_dir = tempfile.mkdtemp(prefix="weather-cache-")
+    os.environ["WEATHER_GEOCODE_DB"] = os.path.join(cache_dir, "geocode.sqlite3")
+    os.environ["WEATHER_ARCHIVE_DIR"] = os.path.join(cache_dir, "archive")
+    try:
+        results = asyncio.run(cold_starts(args.runs, cache_dir))
+    finally:
+        mock.terminate()
+        mock.wait()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print("\n## 起動から最初の応答まで\n")
+    print("| 起動方法 | runs | p50 (ms) | min (ms) | max (ms) |")
+    print("|----------|------|----------|----------|----------|")
+    for name, row in results.items():
+        print(f"| {name} | {row['runs']} | {row['p50_ms']:.0f} | {row['min_ms']:.0f} | {row['max_ms']:.0f} |")
+
+    if args.json:
+        args.json.write_text(
+            json.dumps({"import_ms": total, "modules": dict(modules), "first_response": results}, indent=2)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import asyncio
+import importlib.util
+import os
+import random
+import time
+from dataclasses import dataclass, fields
+
+import httpx
+
+from metrics import Registry
+from ratelimit import RateLimiter
+
+# 再試行してよい（冪等な）メソッドと、再試行する HTTP ステータス
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class UpstreamConfig:
+    """上流 API 用 HTTP クライアントの設定。from_env() で WEATHER_* 環境変数から上書きできる。"""
+
+    connect_timeout: float = 3.0
+    read_timeout: float = 10.0
+    write_timeout: float = 10.0
+    pool_timeout: float = 5.0
+    max_connections: int = 50
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+    retries: int = 2
+    backoff_base: float = 0.2
+    backoff_max: float = 2.0
+    breaker_failures: int = 5
+    breaker_reset: float = 30.0
+    # ホストごとのレート制限（リクエスト/秒）。0 で無効。Open-Meteo の無料枠は 600 回/分。
+    rate_limit: float = 10.0
+    rate_burst: int = 20
+    rate_queue: int = 200
+
+    @classmethod
+    def from_env(cls, prefix: str = "WEATHER_") -> "UpstreamConfig":
+        """例: WEATHER_READ_TIMEOUT=5 WEATHER_HTTP2=1"""
+        config = cls()
+        for f in fields(cls):
+            raw = os.environ.get(prefix + f.name.upper())
+            if raw is None:
+                continue
+            if f.type in (bool, "bool"):
+                value = raw.strip().lower() in ("1", "true", "yes", "on")
+            elif f.type in (int, "int"):
+                value = int(raw)
+            else:
+                value = float(raw)
+            setattr(config, f.name, value)
+        return config
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.write_timeout,
+            pool=self.pool_timeout,
+        )
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+class CircuitOpenError(httpx.TransportError):
+    """サーキットブレーカーが開いているため、上流へ送らずに失敗させた。"""
+
+
+class CircuitBreaker:
+    """連続失敗が閾値を超えたら一定時間リクエストを止める。
+
+    closed（通常）→ open（即失敗）→ reset 秒後に half-open（試しに 1 本だけ通す）
+    → 成功すれば closed、失敗すれば再び open。
+    before_request() を通ったリクエストは、record_success / record_failure / release の
+    どれかを必ず 1 回呼ぶ（呼ばないと half-open の試行枠が返らない）。
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self.rejected = 0
+        self.trips = 0
+
+    @property
+    def closed(self) -> bool:
+        return self.state == "closed"
+
+    def before_request(self, host: str) -> None:
+        if self.state == "open":
+            if self._clock() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                raise CircuitOpenError(f"{host} が不安定なため、一時的にリクエストを止めています。")
+            self.state = "half-open"
+        if self.state == "half-open":
+            if self._probing:
+                self.rejected += 1
+                raise CircuitOpenError(f"{host} の回復を確認中です。しばらくしてから再試行してください。")
+            self._probing = True
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half-open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.trips += 1
+            self.state = "open"
+            self.opened_at = self._clock()
+        self._probing = False
+
+    def release(self) -> None:
+        """成否を数えずに試行枠だけ返す（429 など、上流の障害ではない応答）。"""
+        self._probing = False
+
+    def stats(self) -> dict:
+        return {"state": self.state, "failures": self.failures, "rejected": self.rejected, "trips": self.trips}
+
+
+class ResilientTransport(httpx.AsyncBaseTransport):
+    """接続プール付きトランスポートに、冪等リクエストの再試行とホスト単位のサーキットブレーカーを足す。
+
+    再試行の待ち時間は指数バックオフ（full jitter）。429/503 の Retry-After があればそちらを優先する。
+    レート制限が有効なら、再試行も含めて送信のたびにトークンを取る。
+    """
+
+    def __init__(
+        self,
+        config: UpstreamConfig,
+        inner: httpx.AsyncBaseTransport | None = None,
+        registry: Registry | None = None,
+    ):
+        self.config = config
+        self._inner = inner or httpx.AsyncHTTPTransport(
+            limits=config.limits(),
+            http2=config.http2 and importlib.util.find_spec("h2") is not None,
+        )
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self.limiter = (
+            RateLimiter(config.rate_limit, config.rate_burst, config.rate_queue) if config.rate_limit > 0 else None
+        )
+        self.retries = 0
+        registry = registry or Registry()
+        self._latency = registry.histogram(
+            "weather_upstream_request_seconds", "Upstream HTTP attempt latency.", ("host", "endpoint", "status")
+        )
+        self._errors = registry.counter(
+            "weather_upstream_errors_total", "Failed upstream requests.", ("host", "endpoint", "error")
+        )
+        self._in_flight = registry.gauge("weather_upstream_in_flight", "Upstream requests in progress.", ("host",))
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers[host] = CircuitBreaker(self.config.breaker_failures, self.config.breaker_reset)
+        return breaker
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host, endpoint = request.url.host, request.url.path
+        self._in_flight.inc(host)
+        try:
+            response = await self._send(request)
+        except httpx.TransportError as e:
+            self._errors.inc(host, endpoint, type(e).__name__)
+            raise
+        finally:
+            self._in_flight.dec(host)
+        if response.is_error:
+            self._errors.inc(host, endpoint, str(response.status_code))
+        return response
+
+    async def _send(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        breaker = self.breaker(host)
+        # トークンは試行枠を取る前に取る。待ち行列で打ち切られても half-open の枠を握ったままにしない
+        if self.limiter is not None:
+            await self.limiter.acquire(host)
+        breaker.before_request(host)
+
+        # ブレーカーには論理リクエスト 1 件につき 1 回だけ結果を記録する。429 はレート制限で障害ではないので数えない。
+        # 呼び出し側の打ち切り（CancelledError）は上流の障害ではないので数えずに枠だけ返す。
+        # キュー溢れや想定外の TransportError で抜けたときは失敗として記録する。
+        outcome = breaker.record_failure
+        try:
+            response = await self._attempt(request, breaker)
+            if response.status_code == 429:
+                outcome = breaker.release
+            elif response.status_code not in RETRY_STATUSES:
+                outcome = breaker.record_success
+            return response
+        except asyncio.CancelledError:
+            outcome = breaker.release
+            raise
+        finally:
+            outcome()
+
+    async def _attempt(self, request: httpx.Request, breaker: CircuitBreaker) -> httpx.Response:
+        """冪等なら再試行しながら送る。途中でブレーカーが開いたら（他のリクエストの失敗で）そこでやめる。"""
+        host = request.url.host
+        attempts = 1 + (self.config.retries if request.method in IDEMPOTENT_METHODS else 0)
+        for attempt in range(attempts):
+            last = attempt + 1 >= attempts
+            if attempt and self.limiter is not None:
+                await self.limiter.acquire(host)
+            start = time.perf_counter()
+            try:
+                response = await self._inner.handle_async_request(request)
+            except (httpx.TimeoutException, httpx.NetworkError) as e:
+                self._latency.observe(time.perf_counter() - start, host, request.url.path, type(e).__name__)
+                if last or not breaker.closed:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            self._latency.observe(time.perf_counter() - start, host, request.url.path, response.status_code)
+
+            if response.status_code not in RETRY_STATUSES or last or not breaker.closed:
+                return response
+            delay = self._retry_after(response) or self._backoff(attempt)
+            await response.aclose()
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+        raise AssertionError("unreachable")
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.config.backoff_max, self.config.backoff_base * 2 ** attempt))
+
+    def _retry_after(self, response: httpx.Response) -> float | None:
+        try:
+            delay = float(response.headers.get("Retry-After", ""))
+        except ValueError:
+            return None
+        return min(max(delay, 0.0), self.config.backoff_max)
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "retries": self.retries,
+            "breakers": {host: b.stats() for host, b in self._breakers.items()},
+            "rate_limit": self.limiter.stats() if self.limiter is not None else {},
+        }
+
+
+def build_client(
+    config: UpstreamConfig, registry: Registry | None = None
+) -> tuple[httpx.AsyncClient, ResilientTransport]:
+    transport = ResilientTransport(config, registry=registry)
+    return httpx.AsyncClient(transport=transport, timeout=config.timeout()), transport
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""GIF 生成パイプラインのベンチマーク
+
+「完了」チェックマークと合成ストレスアニメーションを複数のサイズ・フレーム数で生成し、
+ステージごとの時間、ピークメモリ、出力サイズを計測する。保存したベースラインと比較して劣化を検出する。
+
+パイプラインは 2 つ:
+- builder: create_done_emoji.py などが使う GIFBuilder（add_frame で全フレームを保持し、save でまとめて
+  量子化・重複除去・エンコード）。ステージは背景生成・描画・add_frame・save。
+- streaming: StreamingGIFWriter（フレームごとに量子化して追記）。ステージは背景生成・描画・
+  パレット（サンプルの描画は含まない）・量子化・重複除去・LZW エンコード。
+
+Usage:
+    python bench_pipeline.py [--repeat 3] [--only done-128 stress-512x60] [--pipeline builder]
+    python bench_pipeline.py --save-baseline          # 現在の結果をベースラインとして保存
+    python bench_pipeline.py --tolerance 0.2          # ベースラインより 20% 以上遅ければ終了コード 1
+"""
+
+import argparse
+import colorsys
+import json
+import math
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import get_context
+from pathlib import Path
+
+from PIL import ImageDraw
+
+from create_done_emoji import HOLD_LAYOUT, GIFBuilder, create_gradient_background, draw_done
+from create_done_variants import COLORWAYS, NUM_COLORS, Variant, layout_table
+from frame_pool import frame_times
+from streaming_gif import StreamingGIFWriter, sample_palette
+
+PIPELINE_STAGES = {
+    "builder": ("background", "draw", "add_frame", "save"),
+    "streaming": ("background", "draw", "palette", "quantize", "dedupe", "encode"),
+}
+STAGES = tuple(dict.fromkeys(stage for stages in PIPELINE_STAGES.values() for stage in stages))
+DEFAULT_BASELINE = Path(__file__).with_name("bench_baseline.json")
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    kind: str  # "done" or "stress"
+    size: int
+    frames: int = 0  # stress only; the done-check derives its own count
+    fps: int = 15
+
+
+SCENARIOS = [
+    Scenario("done-128", "done", 128),
+    Scenario("done-256", "done", 256),
+    Scenario("done-512", "done", 512),
+    Scenario("stress-256x60", "stress", 256, frames=60),
+    Scenario("stress-512x60", "stress", 512, frames=60),
+    Scenario("stress-512x120", "stress", 512, frames=120, fps=30),
+]
+
+
+def draw_stress(frame, t):
+    """Synthetic worst case: many moving, multi-coloured shapes."""
+    draw = ImageDraw.Draw(frame)
+    size = frame.width
+    c = size / 2
+    for j in range(24):
+        angle = 2 * math.pi * (t + j / 24)
+        r = size * (0.15 + 0.25 * (j % 4) / 3)
+        x = c + r * math.cos(angle * (1 + j % 3))
+        y = c + r * math.sin(angle * (1 + j % 2))
+        rgb = colorsys.hsv_to_rgb((j / 24 + t) % 1.0, 0.8, 0.95)
+        dot = size * 0.04 * (1 + 0.5 * math.sin(angle * 2))
+        draw.ellipse([x - dot, y - dot, x + dot, y + dot], fill=tuple(int(v * 255) for v in rgb))
+    spin = 2 * math.pi * t
+    points = [
+        (c + size * 0.2 * math.cos(spin + k * 2 * math.pi / 5), c + size * 0.2 * math.sin(spin + k * 2 * math.pi / 5))
+        for k in range(5)
+    ]
+    draw.polygon(points, outline=(255, 255, 255), width=max(1, size // 128))
+    return frame
+
+
+def _frame_plan(scenario):
+    """Yield one draw function per frame; each draws onto a fresh background."""
+    if scenario.kind == "done":
+        colors = COLORWAYS["green"]
+        animated, hold = Variant("green", scenario.size, scenario.fps).frame_counts
+        for layout in layout_table(animated) + (HOLD_LAYOUT,) * hold:
+            yield lambda frame, layout=layout: draw_done(frame, layout, colors)
+    else:
+        for t in frame_times(scenario.frames):
+            yield lambda frame, t=t: draw_stress(frame, t)
+
+
+def _background(scenario):
+    colors = COLORWAYS["green"] if scenario.kind == "done" else COLORWAYS["dark"]
+    return lambda: create_gradient_background(scenario.size, scenario.size, colors.bg_top, colors.bg_bottom)
+
+
+def run_builder(scenario, out_dir):
+    """Run the GIFBuilder add_frame -> save path once and return per-stage timings in ms."""
+    plan = list(_frame_plan(scenario))
+    background = _background(scenario)
+    stages = dict.fromkeys(PIPELINE_STAGES["builder"], 0.0)
+
+    start = time.perf_counter()
+    builder = GIFBuilder(width=scenario.size, height=scenario.size, fps=scenario.fps)
+    for draw_fn in plan:
+        t0 = time.perf_counter()
+        frame = background()
+        t1 = time.perf_counter()
+        frame = draw_fn(frame)
+        t2 = time.perf_counter()
+        builder.add_frame(frame)
+        stages["background"] += t1 - t0
+        stages["draw"] += t2 - t1
+        stages["add_frame"] += time.perf_counter() - t2
+
+    path = Path(out_dir) / f"{scenario.name}.gif"
+    t0 = time.perf_counter()
+    # Same options as create_done_emoji.py; the stress scenarios keep their full size.
+    info = builder.save(
+        str(path),
+        num_colors=NUM_COLORS,
+        optimize_for_emoji=scenario.kind == "done",
+        remove_duplicates=True,
+    )
+    stages["save"] = time.perf_counter() - t0
+    return {
+        "stages_ms": {k: round(v * 1000, 3) for k, v in stages.items()},
+        "total_ms": round((time.perf_counter() - start) * 1000, 3),
+        "bytes": path.stat().st_size,
+        "frames_in": len(plan),
+        "frames_out": info["frame_count"],
+    }
+
+
+def run_streaming(scenario, out_dir):
+    """Run the StreamingGIFWriter path once and return per-stage timings in ms."""
+    plan = list(_frame_plan(scenario))
+    background = _background(scenario)
+    stages = dict.fromkeys(PIPELINE_STAGES["streaming"], 0.0)
+
+    # The sample frames are drawn untimed; "palette" is only the shared-palette quantization.
+    samples = [plan[i](background()) for i in (0, len(plan) // 2, -1)]
+    start = time.perf_counter()
+    palette = sample_palette(samples, NUM_COLORS)
+    stages["palette"] = time.perf_counter() - start
+
+    path = Path(out_dir) / f"{scenario.name}.gif"
+    writer = StreamingGIFWriter(path, scenario.size, scenario.size, fps=scenario.fps, palette=palette)
+    for draw_fn in plan:
+        t0 = time.perf_counter()
+        frame = background()
+        t1 = time.perf_counter()
+        frame = draw_fn(frame)
+        t2 = time.perf_counter()
+        writer.add_frame(frame)
+        stages["background"] += t1 - t0
+        stages["draw"] += t2 - t1
+    info = writer.close()
+
+    for stage, seconds in writer.timings.items():
+        stages[stage] = seconds
+    return {
+        "stages_ms": {k: round(v * 1000, 3) for k, v in stages.items()},
+        "total_ms": round((time.perf_counter() - start) * 1000, 3),
+        "bytes": path.stat().st_size,
+        "frames_in": info["frames_in"],
+        "frames_out": info["frame_count"],
+    }
+
+
+PIPELINES = {"builder": run_builder, "streaming": run_streaming}
+
+
+def _peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # bytes on macOS
+
+
+def measure(scenario, pipeline, repeat):
+    """Best-of-N timings plus peak RSS growth; runs in a fresh process."""
+    run = PIPELINES[pipeline]
+    base_rss = _peak_rss_kb()
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = [run(scenario, tmp) for _ in range(repeat)]
+    best = min(runs, key=lambda r: r["total_ms"])
+    best["stages_ms"] = {s: min(r["stages_ms"][s] for r in runs) for s in PIPELINE_STAGES[pipeline]}
+    best["peak_rss_kb"] = _peak_rss_kb() - base_rss
+    return best
+
+
+def compare(results, baseline, tolerance):
+    """Return human-readable regressions against the baseline."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        pairs = [("total", result["total_ms"], base["total_ms"])]
+        pairs += [(s, ms, base["stages_ms"].get(s, 0.0)) for s, ms in result["stages_ms"].items()]
+        for label, now, before in pairs:
+            # Ignore sub-millisecond jitter on tiny stages
+            if now > before * (1 + tolerance) and now - before > 1.0:
+                regressions.append(f"{name} {label}: {before:.1f} ms -> {now:.1f} ms")
+        if result["bytes"] > base["bytes"] * 1.01:
+            regressions.append(f"{name} bytes: {base['bytes']} -> {result['bytes']}")
+        if result["peak_rss_kb"] > base["peak_rss_kb"] * (1 + tolerance) + 1024:
+            regressions.append(f"{name} peak RSS: {base['peak_rss_kb']} KB -> {result['peak_rss_kb']} KB")
+    return regressions
+
+
+def print_table(results):
+    header = "| シナリオ | " + " | ".join(STAGES) + " | 合計 | ピーク RSS | サイズ |"
+    print(header)
+    print("|" + "---|" * (len(STAGES) + 4))
+    for name, r in results.items():
+        stages = " | ".join(f"{r['stages_ms'][s]:.1f}" if s in r["stages_ms"] else "-" for s in STAGES)
+        print(
+            f"| {name} | {stages} | {r['total_ms']:.1f} ms "
+            f"| {r['peak_rss_kb'] / 1024:.1f} MB | {r['bytes'] / 1024:.1f} KB |"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GIF パイプラインのベンチマーク")
+    parser.add_argument("--only", nargs="+", choices=[s.name for s in SCENARIOS])
+    parser.add_argument("--pipeline", nargs="+", choices=list(PIPELINES), default=list(PIPELINES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="許容する劣化率（0.2 = 20%%）")
+    args = parser.parse_args()
+
+    scenarios = [s for s in SCENARIOS if not args.only or s.name in args.only]
+
+    # One fresh process per scenario so peak RSS is not inherited from
+    # earlier, larger scenarios.
+    results = {}
+    ctx = get_context("spawn")
+    for scenario in scenarios:
+        for pipeline in args.pipeline:
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                result = pool.submit(measure, scenario, pipeline, args.repeat).result()
+            results[f"{scenario.name}/{pipeline}"] = result
+
+    print_table(results)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nベースラインを保存しました: {args.baseline}")
+        return
+
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\n劣化を検出しました:")
+            for line in regressions:
+                print(f"- {line}")
+            sys.exit(1)
+        print("\nベースラインからの劣化はありません。")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""「完了」チェックマークを各出力形式で書き出し、エンコード時間・デコード時間・サイズを比較する
+
+Usage:
+    python compare_formats.py [--size 128] [--out-dir formats] [--json report.json]
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+from create_done_variants import COLORWAYS, Variant, variant_frames, variant_palette
+from output_backends import BACKENDS, decode_ms, open_backend, write_all
+
+
+def main():
+    parser = argparse.ArgumentParser(description="出力形式ごとのコスト比較")
+    parser.add_argument("--size", type=int, default=128)
+    parser.add_argument("--fps", type=int, default=15)
+    parser.add_argument("--colors", choices=sorted(COLORWAYS), default="green")
+    parser.add_argument("--formats", nargs="+", choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument("--out-dir", default="formats")
+    parser.add_argument("--json", help="比較結果を JSON で保存するパス")
+    args = parser.parse_args()
+
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    variant = Variant(args.colors, args.size, args.fps)
+    stem = out_dir / variant.name
+    options = {"gif": {"palette": variant_palette(variant)}}
+    writers = {
+        name: open_backend(name, stem, args.size, args.size, fps=args.fps, **options.get(name, {}))
+        for name in args.formats
+    }
+    results = write_all(variant_frames(variant), writers)
+
+    print(f"## {variant.name}\n")
+    print("| 形式 | サイズ | エンコード | デコード |")
+    print("|------|--------|------------|----------|")
+    for name, info in sorted(results.items(), key=lambda kv: kv[1]["size_kb"]):
+        info["decode_ms"] = decode_ms(info["path"])
+        print(
+            f"| {name} | {info['size_kb']:.1f} KB "
+            f"| {info['encode_ms']:.1f} ms | {info['decode_ms']:.1f} ms |"
+        )
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,23 @@
 
 import sys
 import math
+from typing import NamedTuple
 
 sys.path.insert(0, "/Users/nobita2041/.claude/plugins/cache/anthropic-agent-skills/document-skills/1ed29a03dc85/skills/slack-gif-creator")
 
 from core.gif_builder import GIFBuilder
-from core.easing import interpolate, ease_out_bounce
+from core.easing import interpolate
 from core.frame_composer import create_gradient_background
 from PIL import Image, ImageDraw
 
+from frame_pool import render_frames
+
 SIZE = 128
+BASE_SIZE = 128  # the geometry below is authored at this size
 FPS = 15
 TOTAL_FRAMES = 20  # ~1.3s
+HOLD_FRAMES = 5
+WORKERS = None  # None = os.cpu_count(), 1 = render in this process
 
 # Colors
 BG_TOP = (230, 255, 230)       # light green
@@ -24,7 +30,28 @@ CIRCLE_BG = (255, 255, 255)
 SPARKLE_COLOR = (255, 215, 0)  # gold sparkles
 
 
-def draw_checkmark(draw, cx, cy, scale, alpha_img=None):
+class DoneColors(NamedTuple):
+    bg_top: tuple
+    bg_bottom: tuple
+    check: tuple
+    circle: tuple
+    circle_bg: tuple
+    sparkle: tuple
+
+
+class DoneLayout(NamedTuple):
+    """Size- and colour-independent geometry of one frame (BASE_SIZE coordinates)."""
+    cy: int
+    scale: float          # checkmark scale
+    circle_radius: int
+    circle_width: int
+    sparkles: tuple = ()  # (x, y, size) per visible sparkle
+
+
+DEFAULT_COLORS = DoneColors(BG_TOP, BG_BOTTOM, CHECK_COLOR, CIRCLE_COLOR, CIRCLE_BG, SPARKLE_COLOR)
+
+
+def draw_checkmark(draw, cx, cy, scale, alpha_img=None, color=CHECK_COLOR):
     """Draw a thick checkmark centered at (cx, cy) with given scale."""
     # Checkmark points (relative to center, normalized to ~40px)
     # Short arm: goes down-left to bottom
@@ -41,103 +68,137 @@ def draw_checkmark(draw, cx, cy, scale, alpha_img=None):
     rx, ry = cx + 20 * s, cy - 18 * s
 
     # Draw as thick lines
-    draw.line([(lx, ly), (bx, by)], fill=CHECK_COLOR, width=max(3, int(8 * scale)))
-    draw.line([(bx, by), (rx, ry)], fill=CHECK_COLOR, width=max(3, int(8 * scale)))
+    draw.line([(lx, ly), (bx, by)], fill=color, width=max(3, int(8 * scale)))
+    draw.line([(bx, by), (rx, ry)], fill=color, width=max(3, int(8 * scale)))
 
     # Round caps at endpoints
     cap_r = max(1, int(4 * scale))
     for px, py in [(lx, ly), (bx, by), (rx, ry)]:
-        draw.ellipse([px - cap_r, py - cap_r, px + cap_r, py + cap_r], fill=CHECK_COLOR)
+        draw.ellipse([px - cap_r, py - cap_r, px + cap_r, py + cap_r], fill=color)
 
 
-def draw_circle_outline(draw, cx, cy, radius, width=3):
+def draw_circle_outline(draw, cx, cy, radius, width=3, fill=CIRCLE_BG, outline=CIRCLE_COLOR):
     """Draw a circle outline."""
     draw.ellipse(
         [cx - radius, cy - radius, cx + radius, cy + radius],
-        fill=CIRCLE_BG,
-        outline=CIRCLE_COLOR,
+        fill=fill,
+        outline=outline,
         width=width,
     )
 
 
-def draw_sparkle(draw, x, y, size, color):
+def draw_sparkle(draw, x, y, size, color, width=2):
     """Draw a small 4-pointed sparkle."""
-    draw.line([(x, y - size), (x, y + size)], fill=color, width=2)
-    draw.line([(x - size, y), (x + size, y)], fill=color, width=2)
+    draw.line([(x, y - size), (x, y + size)], fill=color, width=width)
+    draw.line([(x - size, y), (x + size, y)], fill=color, width=width)
 
 
-builder = GIFBuilder(width=SIZE, height=SIZE, fps=FPS)
-
-for i in range(TOTAL_FRAMES):
-    t = i / (TOTAL_FRAMES - 1)  # 0.0 -> 1.0
-
-    # Create background
-    frame = create_gradient_background(SIZE, SIZE, BG_TOP, BG_BOTTOM)
-    draw = ImageDraw.Draw(frame)
-
-    cx, cy_target = SIZE // 2, SIZE // 2 + 4
+def done_layout(t):
+    """Compute the frame geometry at t (0.0 -> 1.0)."""
+    cx, cy_target = BASE_SIZE // 2, BASE_SIZE // 2 + 4
 
     # Phase 1: Bounce in from top (frames 0-14)
     if t <= 0.75:
         bounce_t = t / 0.75
-        eased = ease_out_bounce(bounce_t)
         cy = interpolate(-30, cy_target, bounce_t, easing='bounce_out')
         scale = interpolate(0.5, 1.0, bounce_t, easing='ease_out')
-        circle_radius = int(38 * scale)
-
-        # Draw circle
-        draw_circle_outline(draw, cx, int(cy), circle_radius, width=max(2, int(3 * scale)))
-        # Draw checkmark
-        draw_checkmark(draw, cx, int(cy), scale)
+        return DoneLayout(
+            cy=int(cy),
+            scale=scale,
+            circle_radius=int(38 * scale),
+            circle_width=max(2, int(3 * scale)),
+        )
 
     # Phase 2: Settle + sparkles (frames 15-19)
-    else:
-        settle_t = (t - 0.75) / 0.25
-        cy = cy_target
-        scale = 1.0
-
-        # Subtle pulse
-        pulse = 1.0 + 0.05 * math.sin(settle_t * math.pi * 2)
-        circle_radius = int(38 * pulse)
-
-        # Draw circle
-        draw_circle_outline(draw, cx, int(cy), circle_radius, width=3)
-        # Draw checkmark
-        draw_checkmark(draw, cx, int(cy), pulse)
-
-        # Sparkles appear and fade
-        sparkle_alpha = 1.0 - settle_t * 0.5
-        sparkle_size = int(6 * sparkle_alpha)
-        if sparkle_size > 1:
-            # 4 sparkles around the circle
-            offsets = [
-                (cx - 45, cy - 35),
-                (cx + 42, cy - 30),
-                (cx - 35, cy + 38),
-                (cx + 40, cy + 35),
-            ]
-            for j, (sx, sy) in enumerate(offsets):
-                # Stagger sparkle appearance
-                if settle_t > j * 0.15:
-                    local_t = min(1.0, (settle_t - j * 0.15) / 0.4)
-                    s = int(sparkle_size * (1 - local_t * 0.5))
-                    if s > 1:
-                        draw_sparkle(draw, sx, sy, s, SPARKLE_COLOR)
-
-    builder.add_frame(frame)
-
-# Add a few static hold frames at the end for looping feel
-for _ in range(5):
-    frame = create_gradient_background(SIZE, SIZE, BG_TOP, BG_BOTTOM)
+    settle_t = (t - 0.75) / 0.25
+    cy = cy_target
+
+    # Subtle pulse
+    pulse = 1.0 + 0.05 * math.sin(settle_t * math.pi * 2)
+
+    # Sparkles appear and fade
+    sparkles = []
+    sparkle_alpha = 1.0 - settle_t * 0.5
+    sparkle_size = int(6 * sparkle_alpha)
+    if sparkle_size > 1:
+        # 4 sparkles around the circle
+        offsets = [
+            (cx - 45, cy - 35),
+            (cx + 42, cy - 30),
+            (cx - 35, cy + 38),
+            (cx + 40, cy + 35),
+        ]
+        for j, (sx, sy) in enumerate(offsets):
+            # Stagger sparkle appearance
+            if settle_t > j * 0.15:
+                local_t = min(1.0, (settle_t - j * 0.15) / 0.4)
+                s = int(sparkle_size * (1 - local_t * 0.5))
+                if s > 1:
+                    sparkles.append((sx, sy, s))
+
+    return DoneLayout(
+        cy=cy,
+        scale=pulse,
+        circle_radius=int(38 * pulse),
+        circle_width=3,
+        sparkles=tuple(sparkles),
+    )
+
+
+# Settled end state used for the looping hold
+HOLD_LAYOUT = DoneLayout(cy=BASE_SIZE // 2 + 4, scale=1.0, circle_radius=38, circle_width=3)
+
+
+def draw_done(frame, layout, colors=DEFAULT_COLORS):
+    """Draw one layout onto a background, scaled from BASE_SIZE to the frame size."""
     draw = ImageDraw.Draw(frame)
-    cx, cy = SIZE // 2, SIZE // 2 + 4
-    draw_circle_outline(draw, cx, cy, 38, width=3)
-    draw_checkmark(draw, cx, cy, 1.0)
-    builder.add_frame(frame)
-
-info = builder.save(
-    'done_check.gif',
-    num_colors=48,
-    optimize_for_emoji=True,
-    remove_duplicates=True,
-)
+    k = frame.width / BASE_SIZE
+    cx, cy = frame.width // 2, int(layout.cy * k)
+
+    draw_circle_outline(
+        draw, cx, cy, int(layout.circle_radius * k),
+        width=max(1, round(layout.circle_width * k)),
+        fill=colors.circle_bg,
+        outline=colors.circle,
+    )
+    draw_checkmark(draw, cx, cy, layout.scale * k, color=colors.check)
+    for sx, sy, s in layout.sparkles:
+        draw_sparkle(draw, sx * k, sy * k, int(s * k), colors.sparkle, width=max(1, round(2 * k)))
+    return frame
+
+
+def render_done_frame(t):
+    """Render the bounce-in animation at t (0.0 -> 1.0)."""
+    frame = create_gradient_background(SIZE, SIZE, BG_TOP, BG_BOTTOM)
+    return draw_done(frame, done_layout(t))
+
+
+def render_hold_frame():
+    """Render the settled end state used for the looping hold."""
+    frame = create_gradient_background(SIZE, SIZE, BG_TOP, BG_BOTTOM)
+    return draw_done(frame, HOLD_LAYOUT)
+
+
+def main():
+    builder = GIFBuilder(width=SIZE, height=SIZE, fps=FPS)
+
+    # Frames depend only on t, so they are rendered in parallel and
+    # streamed into the builder in frame order.
+    for frame in render_frames(render_done_frame, TOTAL_FRAMES, workers=WORKERS):
+        builder.add_frame(frame)
+
+    # Add a few static hold frames at the end for looping feel
+    hold = render_hold_frame()
+    for _ in range(HOLD_FRAMES):
+        builder.add_frame(hold.copy())
+
+    return builder.save(
+        'done_check.gif',
+        num_colors=48,
+        optimize_for_emoji=True,
+        remove_duplicates=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
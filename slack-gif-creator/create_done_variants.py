@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""「完了」チェックマーク GIF のカラー・サイズ・FPS バリエーション一括生成
+
+Usage:
+    python create_done_variants.py [--colors green blue] [--sizes 64 128 256] [--fps 10 15 24] [--out-dir variants]
+
+全バリエーションを 1 プロセスで描画し、イージング計算（レイアウト表）と
+背景グラデーションをバリエーション間で共有する。出力先に manifest.json を書き出す。
+"""
+
+import argparse
+import json
+import time
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from itertools import product
+from pathlib import Path
+
+from create_done_emoji import (
+    DEFAULT_COLORS,
+    FPS,
+    HOLD_FRAMES,
+    HOLD_LAYOUT,
+    TOTAL_FRAMES,
+    DoneColors,
+    create_gradient_background,
+    done_layout,
+    draw_done,
+)
+from frame_pool import frame_times
+from streaming_gif import StreamingGIFWriter, sample_palette
+
+NUM_COLORS = 48
+
+COLORWAYS = {
+    "green": DEFAULT_COLORS,
+    "blue": DoneColors(
+        bg_top=(225, 240, 255), bg_bottom=(175, 205, 240),
+        check=(30, 110, 210), circle=(30, 110, 210),
+        circle_bg=(255, 255, 255), sparkle=(255, 215, 0),
+    ),
+    "orange": DoneColors(
+        bg_top=(255, 242, 225), bg_bottom=(245, 205, 165),
+        check=(235, 120, 20), circle=(235, 120, 20),
+        circle_bg=(255, 255, 255), sparkle=(255, 90, 90),
+    ),
+    "purple": DoneColors(
+        bg_top=(242, 232, 255), bg_bottom=(210, 190, 240),
+        check=(130, 70, 200), circle=(130, 70, 200),
+        circle_bg=(255, 255, 255), sparkle=(255, 215, 0),
+    ),
+    "dark": DoneColors(
+        bg_top=(45, 50, 60), bg_bottom=(25, 28, 35),
+        check=(80, 220, 120), circle=(80, 220, 120),
+        circle_bg=(35, 40, 48), sparkle=(255, 215, 0),
+    ),
+}
+SIZES = (64, 128, 256)
+FPS_OPTIONS = (10, 15, 24)
+
+
+@dataclass(frozen=True)
+class Variant:
+    colorway: str
+    size: int
+    fps: int
+
+    @property
+    def name(self):
+        return f"done_check_{self.colorway}_{self.size}px_{self.fps}fps"
+
+    @property
+    def frame_counts(self):
+        """(animated, hold) frame counts that keep the default duration at this FPS."""
+        animated = max(2, round(TOTAL_FRAMES * self.fps / FPS))
+        hold = max(1, round(HOLD_FRAMES * self.fps / FPS))
+        return animated, hold
+
+
+@lru_cache(maxsize=None)
+def layout_table(total_frames):
+    """Easing/geometry for every frame; shared by all colours and sizes."""
+    return tuple(done_layout(t) for t in frame_times(total_frames))
+
+
+@lru_cache(maxsize=None)
+def background(size, bg_top, bg_bottom):
+    """Gradient background, rendered once per size and colourway."""
+    return create_gradient_background(size, size, bg_top, bg_bottom)
+
+
+def variant_frames(variant):
+    """Yield the frames of one variant in order."""
+    colors = COLORWAYS[variant.colorway]
+    bg = background(variant.size, colors.bg_top, colors.bg_bottom)
+    animated, hold = variant.frame_counts
+
+    for layout in layout_table(animated):
+        yield draw_done(bg.copy(), layout, colors)
+    hold_frame = draw_done(bg.copy(), HOLD_LAYOUT, colors)
+    for _ in range(hold):
+        yield hold_frame
+
+
+def variant_palette(variant):
+    """Shared GIF palette sampled from the first, middle and last frames."""
+    colors = COLORWAYS[variant.colorway]
+    bg = background(variant.size, colors.bg_top, colors.bg_bottom)
+    table = layout_table(variant.frame_counts[0])
+    samples = [draw_done(bg.copy(), table[i], colors) for i in (0, len(table) // 2, -1)]
+    return sample_palette(samples, NUM_COLORS)
+
+
+def render_variant(variant, out_dir):
+    """Write one variant and return its manifest entry."""
+    start = time.perf_counter()
+    animated, hold = variant.frame_counts
+
+    path = Path(out_dir) / f"{variant.name}.gif"
+    palette = variant_palette(variant)
+    with StreamingGIFWriter(path, variant.size, variant.size, fps=variant.fps, palette=palette) as writer:
+        writer.add_frames(variant_frames(variant))
+    info = writer.close()
+
+    return {
+        **asdict(variant),
+        "name": variant.name,
+        "path": path.name,
+        "frames": animated + hold,
+        "frames_written": info["frame_count"],
+        "duration_ms": info["duration_ms"],
+        "bytes": path.stat().st_size,
+        "render_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="「完了」GIF のバリエーションを一括生成")
+    parser.add_argument("--colors", nargs="+", choices=sorted(COLORWAYS), default=list(COLORWAYS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES))
+    parser.add_argument("--fps", nargs="+", type=int, default=list(FPS_OPTIONS))
+    parser.add_argument("--out-dir", default="variants")
+    args = parser.parse_args()
+
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    entries = []
+    for colorway, size, fps in product(args.colors, args.sizes, args.fps):
+        entry = render_variant(Variant(colorway, size, fps), out_dir)
+        entries.append(entry)
+        print(f"  {entry['path']}: {entry['bytes'] / 1024:.1f} KB, {entry['render_ms']} ms")
+
+    manifest = {
+        "variants": entries,
+        "total_bytes": sum(e["bytes"] for e in entries),
+        "total_render_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+    manifest_path = out_dir / "manifest.json"
+    manifest_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"{len(entries)} variants -> {manifest_path} ({manifest['total_render_ms']} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""frame(t) -> Image 形式のアニメーションをプロセスプールで並列レンダリングする"""
+
+import os
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+FrameFunc = Callable[[float], Image.Image]
+
+
+def frame_times(total_frames: int) -> list[float]:
+    """Return t = i / (total_frames - 1) for every frame, 0.0 -> 1.0."""
+    if total_frames < 1:
+        raise ValueError("total_frames must be at least 1")
+    if total_frames == 1:
+        return [0.0]
+    return [i / (total_frames - 1) for i in range(total_frames)]
+
+
+def render_frames(
+    frame_fn: FrameFunc,
+    total_frames: int,
+    workers: int | None = None,
+) -> Iterator[Image.Image]:
+    """Render frame_fn(t) for every frame and yield the images in frame order.
+
+    frame_fn must be a module-level function (or a functools.partial of one)
+    so it can be pickled into worker processes. Frames are yielded as soon as
+    they are ready in order, so they can be streamed straight into an encoder.
+    workers=1 renders inline without starting a pool.
+    """
+    times = frame_times(total_frames)
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, total_frames)
+
+    if workers == 1:
+        for t in times:
+            yield frame_fn(t)
+        return
+
+    # A few chunks per worker keeps pickling overhead low while still
+    # balancing frames whose cost differs (e.g. sparkle phases).
+    chunksize = max(1, total_frames // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(frame_fn, times, chunksize=chunksize)
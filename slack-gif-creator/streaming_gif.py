@@ -0,0 +1,201 @@
+"""フレームを受け取るたびに量子化・LZW エンコードして書き出すストリーミング GIF ライター
+
+GIFBuilder は save() まで全フレームを保持するため、フレーム数と解像度に比例して
+メモリが増える。StreamingGIFWriter は固定（または事前サンプリングした）パレットに
+各フレームを量子化してその場でファイルへ追記するので、保持するのは直前の
+1 フレームだけになる。
+"""
+
+import os
+import struct
+import time
+from collections.abc import Iterable, Sequence
+
+from PIL import GifImagePlugin, Image, ImageChops
+
+Palette = Sequence[tuple[int, int, int]]
+
+
+def sample_palette(frames: Iterable[Image.Image], num_colors: int = 256) -> list[tuple[int, int, int]]:
+    """Build a shared palette from a few sample frames.
+
+    The samples are tiled into one strip and quantized together, so colours
+    that only appear late in the animation still get a palette entry.
+    """
+    samples = [f.convert("RGB") for f in frames]
+    if not samples:
+        raise ValueError("at least one sample frame is required")
+    width = max(f.width for f in samples)
+    strip = Image.new("RGB", (width, sum(f.height for f in samples)))
+    y = 0
+    for f in samples:
+        strip.paste(f, (0, y))
+        y += f.height
+
+    quantized = strip.quantize(colors=num_colors, method=Image.Quantize.MEDIANCUT)
+    raw = quantized.getpalette()[: 3 * num_colors]
+    return [tuple(raw[i:i + 3]) for i in range(0, len(raw), 3)]
+
+
+class StreamingGIFWriter:
+    """Encode frames to a GIF file one at a time with constant memory.
+
+    Frames are quantized against a single global palette. Each frame is
+    held back until the next one arrives so identical consecutive frames
+    can be merged into one longer frame, and only the region that changed
+    since the previous frame is written.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        width: int,
+        height: int,
+        fps: int = 15,
+        palette: Palette | None = None,
+        num_colors: int = 256,
+        loop: int = 0,
+        dither: bool = False,
+    ):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.num_colors = num_colors
+        self.loop = loop
+        self.dither = Image.Dither.FLOYDSTEINBERG if dither else Image.Dither.NONE
+
+        self._fp = open(path, "wb")
+        self._palette_image: Image.Image | None = None
+        self._previous: Image.Image | None = None  # last frame written to disk
+        self._pending: Image.Image | None = None  # frame waiting for its duration
+        self._pending_frames = 0
+        self._frames_in = 0
+        self._frames_out = 0
+        self._frames_consumed = 0  # input frames already on disk
+        self._elapsed_cs = 0
+        self._closed = False
+        # Wall time spent per pipeline stage, in seconds
+        self.timings = {"quantize": 0.0, "dedupe": 0.0, "encode": 0.0}
+
+        if palette is not None:
+            self._start(palette)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._fp.close()
+            self._closed = True
+
+    def add_frame(self, frame: Image.Image) -> None:
+        """Quantize one frame and append it to the output."""
+        if self._closed:
+            raise ValueError("writer is closed")
+        if frame.size != (self.width, self.height):
+            frame = frame.resize((self.width, self.height), Image.Resampling.LANCZOS)
+        frame = frame.convert("RGB")
+
+        if self._palette_image is None:
+            # No palette given: derive it from the first frame.
+            self._start(sample_palette([frame], self.num_colors))
+
+        start = time.perf_counter()
+        indexed = frame.quantize(palette=self._palette_image, dither=self.dither)
+        self._frames_in += 1
+        quantized = time.perf_counter()
+        self.timings["quantize"] += quantized - start
+
+        duplicate = self._pending is not None and _same_pixels(self._pending, indexed)
+        self.timings["dedupe"] += time.perf_counter() - quantized
+        if duplicate:
+            self._pending_frames += 1
+            return
+
+        self._flush_pending()
+        self._pending = indexed
+        self._pending_frames = 1
+
+    def add_frames(self, frames: Iterable[Image.Image]) -> None:
+        for frame in frames:
+            self.add_frame(frame)
+
+    def close(self) -> dict:
+        """Write the last frame and the trailer, then return file info."""
+        if not self._closed:
+            if self._palette_image is None:
+                raise ValueError("no frames were added")
+            self._flush_pending()
+            self._fp.write(b";")
+            self._fp.close()
+            self._closed = True
+
+        size = os.path.getsize(self.path)
+        return {
+            "path": str(self.path),
+            "size_kb": size / 1024,
+            "frame_count": self._frames_out,
+            "frames_in": self._frames_in,
+            "duration_ms": self._elapsed_cs * 10,
+        }
+
+    def _start(self, palette: Palette) -> None:
+        colors = list(palette)[:256]
+        if not colors:
+            raise ValueError("palette must contain at least one colour")
+
+        # The global colour table must hold a power of two entries.
+        bits = max(1, (len(colors) - 1).bit_length())
+        table = colors + [(0, 0, 0)] * ((1 << bits) - len(colors))
+
+        self._palette_image = Image.new("P", (1, 1))
+        self._palette_image.putpalette([c for rgb in table for c in rgb])
+
+        self._fp.write(b"GIF89a")
+        self._fp.write(struct.pack("<HHBBB", self.width, self.height, 0x80 | 0x70 | (bits - 1), 0, 0))
+        self._fp.write(bytes(c for rgb in table for c in rgb))
+        # NETSCAPE2.0 application extension: loop count
+        self._fp.write(b"!\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack("<H", self.loop) + b"\x00")
+
+    def _flush_pending(self) -> None:
+        if self._pending is None:
+            return
+
+        # Track the timeline in centiseconds so rounding does not drift
+        # (15 fps is 6.67cs per frame).
+        end_cs = round((self._frames_consumed + self._pending_frames) * 100 / self.fps)
+        duration_cs = max(2, end_cs - self._elapsed_cs)
+
+        start = time.perf_counter()
+        frame, offset = self._pending, (0, 0)
+        if self._previous is not None:
+            bbox = _changed_bbox(self._previous, frame)
+            if bbox is not None:
+                frame, offset = frame.crop(bbox), bbox[:2]
+        cropped = time.perf_counter()
+        self.timings["dedupe"] += cropped - start
+
+        for chunk in GifImagePlugin.getdata(frame, offset=offset, duration=duration_cs * 10, disposal=1):
+            self._fp.write(chunk)
+        self.timings["encode"] += time.perf_counter() - cropped
+
+        self._elapsed_cs += duration_cs
+        self._frames_out += 1
+        self._frames_consumed += self._pending_frames
+        self._previous = self._pending
+        self._pending = None
+        self._pending_frames = 0
+
+
+def _same_pixels(a: Image.Image, b: Image.Image) -> bool:
+    return a.tobytes() == b.tobytes()
+
+
+def _changed_bbox(a: Image.Image, b: Image.Image) -> tuple[int, int, int, int] | None:
+    # Palette indices are compared as greyscale so the diff is exact.
+    a_l = Image.frombytes("L", a.size, a.tobytes())
+    b_l = Image.frombytes("L", b.size, b.tobytes())
+    return ImageChops.difference(a_l, b_l).getbbox()